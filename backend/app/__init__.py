@@ -5,30 +5,43 @@ from flask_cors import CORS # type: ignore
 from flask_migrate import Migrate # type: ignore
 from flask_sqlalchemy import SQLAlchemy # type: ignore
 from sqlalchemy import MetaData
-from config import Config
+from config import get_config
+from .cache import ResponseCache
+from .engines import RoutingSession, configure_engines
+from .passwords import PasswordHasher
 
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
 migrate = Migrate()
 bcrypt = Bcrypt()
+password_hasher = PasswordHasher(bcrypt)
+response_cache = ResponseCache()
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    app.config.from_object(config_class or get_config())
 
     CORS(
         app,
         supports_credentials=True,
-        origins=["http://localhost:3000", "https://tech-time-capsule-client.onrender.com"]
+        origins=["http://localhost:3000", "https://tech-time-capsule-client.onrender.com"],
+        expose_headers=["X-Next-Cursor", "ETag"]
     )
 
     db.init_app(app)
+    configure_engines(app, db)
     migrate.init_app(app, db)
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
+    response_cache.init_app(app)
     
+    if app.config.get('METRICS_ENABLED'):
+        from .instrumentation import request_metrics
+        request_metrics.init_app(app)
+
     from .routes import bp as main_bp
     app.register_blueprint(main_bp)
 
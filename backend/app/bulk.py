@@ -0,0 +1,92 @@
+from sqlalchemy import tuple_
+from . import db
+from .dialects import dialect_insert
+from .models import Event, EventCategory
+from .stats import TimelineDelta
+
+EVENT_NATURAL_KEY = ('year', 'month', 'day', 'title')
+
+class BulkEventWriter:
+    """Buffers event rows, dedupes them on the natural key and writes each batch
+    with one INSERT ... ON CONFLICT DO NOTHING followed by a commit.
+
+    Category links passed to add() are written in the same transaction, to new
+    events and to stored ones owned by the row's user_id (never to another
+    user's event), again skipping pairs that exist. The timeline aggregates
+    are bumped for exactly the rows and links written.
+
+    `before_commit(inserted)` runs inside each batch's transaction, so anything
+    it writes lands atomically with the batch.
+
+        with BulkEventWriter(batch_size=1000) as writer:
+            for row in rows: writer.add(row)
+    """
+
+    def __init__(self, batch_size=1000, before_commit=None):
+        self.batch_size = batch_size
+        self.before_commit = before_commit
+        self.pending = {}
+        self.links = {}
+        self.received = 0
+        self.inserted = 0
+        self.linked = 0
+        self.linked_event_ids = set()  # events that gained links in the last flush
+
+    def add(self, row, links=None):
+        """Queue an event row; `links` maps category_id -> relationship_description."""
+        self.received += 1
+        key = tuple(row[k] for k in EVENT_NATURAL_KEY)
+        self.pending.setdefault(key, row)
+        if links: self.links.setdefault(key, {}).update(links)
+        if len(self.pending) >= self.batch_size: self.flush()
+
+    def flush(self):
+        """Write the pending batch; return (id, year, month, day, title) for rows that were new."""
+        if not self.pending: return []
+        stmt = dialect_insert(Event.__table__).on_conflict_do_nothing(index_elements=list(EVENT_NATURAL_KEY))
+        stmt = stmt.returning(Event.id, *(getattr(Event, k) for k in EVENT_NATURAL_KEY))
+        self.linked_event_ids = set()
+        try:
+            inserted = db.session.execute(stmt, list(self.pending.values())).all()
+            delta = TimelineDelta()
+            for _, year, month, day, _ in inserted: delta.add_event(year, month, day)
+            if self.links: self._write_links(inserted, delta)
+            delta.apply()
+            if self.before_commit: self.before_commit(inserted)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            self.pending.clear()
+            self.links.clear()
+        self.inserted += len(inserted)
+        return inserted
+
+    def _write_links(self, inserted, delta):
+        ids = {tuple(row[1:]): row[0] for row in inserted}
+        missing = [key for key in self.links if key not in ids]
+        key_columns = tuple_(*(getattr(Event, k) for k in EVENT_NATURAL_KEY))
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            stored = db.session.query(Event.id, Event.user_id, *(getattr(Event, k) for k in EVENT_NATURAL_KEY)).filter(key_columns.in_(chunk))
+            for event_id, user_id, *key in stored:
+                key = tuple(key)
+                if key in self.pending and self.pending[key]['user_id'] == user_id: ids[key] = event_id
+        rows = [{'event_id': ids[key], 'category_id': category_id, 'relationship_description': description}
+                for key, links in self.links.items() if key in ids for category_id, description in links.items()]
+        if not rows: return
+        stmt = dialect_insert(EventCategory.__table__).on_conflict_do_nothing(index_elements=['event_id', 'category_id'])
+        linked = db.session.execute(stmt.returning(EventCategory.event_id, EventCategory.category_id), rows).all()
+        years = {event_id: key[0] for key, event_id in ids.items()}
+        for event_id, category_id in linked: delta.add_links(years[event_id], [category_id])
+        self.linked_event_ids = {event_id for event_id, _ in linked}
+        self.linked += len(linked)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: return self.flush()
+        self.pending.clear()
+        self.links.clear()
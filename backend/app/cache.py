@@ -0,0 +1,207 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import Response, current_app, request
+
+class TagFile:
+    """Tag versions shared by every process on the host that opens `path`.
+
+    The file is `slots` 8-byte counters, memory-mapped; a tag's counter is
+    picked by its crc32. Tags that share a slot only invalidate each other,
+    they never make a stale entry reachable. Reads and bumps hold an flock, so
+    a counter is never seen half-written.
+    """
+
+    SLOT = struct.Struct('<Q')
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def _open(self):
+        # Per process: a descriptor inherited across fork() would share its flock with the parent.
+        if self.pid == os.getpid(): return
+        if self.pid is not None:
+            self.map.close()
+            os.close(self.fd)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < self.slots * 8: os.ftruncate(fd, self.slots * 8)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self.map = mmap.mmap(fd, self.slots * 8)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd, self.pid = fd, os.getpid()
+
+    def _offset(self, tag):
+        return zlib.crc32(tag.encode('utf-8')) % self.slots * 8
+
+    def versions(self, tags):
+        offsets = [self._offset(tag) for tag in tags]
+        with self.lock:
+            self._open()
+            fcntl.flock(self.fd, fcntl.LOCK_SH)
+            try:
+                return [self.SLOT.unpack_from(self.map, offset)[0] for offset in offsets]
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def bump(self, tags):
+        offsets = {self._offset(tag) for tag in tags}
+        with self.lock:
+            self._open()
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                for offset in offsets: self.SLOT.pack_into(self.map, offset, self.SLOT.unpack_from(self.map, offset)[0] + 1)
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+class MemoryBackend:
+    """Per-process LRU with a TTL. Tag versions live outside the LRU so they are never evicted,
+    in `tags` (a TagFile, so every worker sees an invalidation) or else in this process only."""
+
+    def __init__(self, max_entries=2048, ttl=300, tags=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.tags = tags
+        self.tag_versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None: return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+
+    def versions(self, tags):
+        if self.tags: return self.tags.versions(tags)
+        with self.lock:
+            return [self.tag_versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        if self.tags: return self.tags.bump(tags)
+        with self.lock:
+            for tag in tags: self.tag_versions[tag] = self.tag_versions.get(tag, 0) + 1
+
+class RedisBackend:
+    """Shared across gunicorn workers. `client` is anything with redis-py's
+    get/set/mget/incr/pipeline, so a local stand-in can take its place."""
+
+    def __init__(self, client, ttl=300, prefix='ttc:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def versions(self, tags):
+        return [int(v or 0) for v in self.client.mget([f'{self.prefix}tag:{tag}' for tag in tags])]
+
+    def bump(self, tags):
+        pipe = self.client.pipeline()
+        for tag in tags: pipe.incr(f'{self.prefix}tag:{tag}')
+        pipe.execute()
+
+class NullBackend:
+    def get(self, key): return None
+    def set(self, key, value): pass
+    def versions(self, tags): return [0] * len(tags)
+    def bump(self, tags): pass
+
+class ResponseCache:
+    """Caches JSON GET responses under tags and serves them with ETags.
+
+    An entry's key folds in the current version of each of its tags, so
+    invalidate('event:5') makes exactly the entries tagged 'event:5'
+    unreachable without scanning anything; they age out of the LRU/TTL.
+    Every entry is also tagged 'all', which clear() bumps.
+    """
+
+    def init_app(self, app, backend=None):
+        if backend is None:
+            kind = app.config.get('CACHE_BACKEND', 'memory')
+            ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+            if kind == 'redis':
+                import redis # type: ignore
+                backend = RedisBackend(redis.Redis.from_url(app.config['CACHE_REDIS_URL']), ttl=ttl)
+            elif kind == 'memory':
+                path = app.config.get('CACHE_TAG_FILE') or os.path.join(app.instance_path, 'cache_tags')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 2048), ttl, TagFile(path))
+            else:
+                backend = NullBackend()
+        app.extensions['response_cache'] = backend
+
+    @property
+    def backend(self):
+        return current_app.extensions['response_cache']
+
+    def _key(self, tags):
+        tags = ['all', *tags]
+        args = sorted((k, sorted(request.args.getlist(k))) for k in request.args)
+        raw = json.dumps([request.path, args, tags, self.backend.versions(tags)], separators=(',', ':'))
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=20).hexdigest()
+
+    def respond(self, tags, build, private=False):
+        """Serve the cached response for this request, or build(), store and serve it.
+
+        Per-user responses must carry a user tag (it is part of the key) and
+        pass private=True so shared caches never keep them. build() may return
+        (response, more_tags) for tags only known once the rows are loaded,
+        like an event's categories: the entry keeps their versions and a hit
+        is rebuilt once any of them has moved.
+        """
+        key = self._key(tags)
+        entry = self.backend.get(key)
+        if entry is not None and entry.get('more'):
+            more = [tag for tag, _ in entry['more']]
+            if self.backend.versions(more) != [version for _, version in entry['more']]: entry = None
+        if entry is None:
+            response, more = build(), ()
+            if isinstance(response, tuple): response, more = response
+            if response.status_code != 200 or response.is_streamed: return response
+            body = response.get_data(as_text=True)
+            headers = {k: v for k, v in response.headers.items() if k.startswith('X-')}
+            entry = {'etag': hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest(), 'body': body, 'headers': headers}
+            if more:
+                more = list(dict.fromkeys(more))
+                entry['more'] = [list(pair) for pair in zip(more, self.backend.versions(more))]
+            self.backend.set(key, entry)
+        response = Response(entry['body'], mimetype='application/json', headers=entry['headers'])
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+        return response.make_conditional(request)
+
+    def invalidate(self, *tags):
+        if tags: self.backend.bump(list(dict.fromkeys(tags)))
+
+    def clear(self):
+        self.backend.bump(['all'])
@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import text
+from . import db, response_cache
+
+try:
+    import numpy as np # type: ignore
+except ImportError:
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+NAT = -(2 ** 63)  # numpy's int64 view of a missing datetime64
+# Rows without created_at: below every real timestamp, so they come last when
+# sorting newest first, and unlike NaT still in range once negated.
+NO_TIMESTAMP = NAT + 1
+# Writes that can change a list bump one of these cache tags (or clear()s 'all').
+WATCHED_TAGS = ('all', 'events:all', 'categories')
+
+def _micros(value):
+    return NO_TIMESTAMP if value is None else (value - EPOCH) // timedelta(microseconds=1)
+
+def _historical_key(year, month, day, event_id):
+    # (year, month, day, id) packed into one int64 that sorts the same way.
+    return ((year + 32768) << 41) | (month << 37) | (day << 32) | event_id
+
+class Snapshot:
+    """Columns for every event, stored in historical (year, month, day, id) order.
+
+    Each category keeps a packed bitset over those positions, and `newest`
+    is the permutation that walks them by (created_at, id) descending.
+    """
+
+    def __init__(self, chunk_size=100_000):
+        # Raw driver rows: no ORDER BY (numpy sorts faster than an index walk)
+        # and no per-row DateTime processing; numpy parses SQLite's text
+        # timestamps and psycopg2's datetimes alike.
+        connection = db.session.connection()
+        ids, years, months, days, created = [], [], [], [], []
+        for rows in connection.execute(text('SELECT id, year, month, day, created_at FROM events').execution_options(stream_results=True)).partitions(chunk_size):
+            columns = list(zip(*rows))
+            ids.append(np.array(columns[0], dtype=np.int64))
+            years.append(np.array(columns[1], dtype=np.int16))
+            months.append(np.array(columns[2], dtype=np.int8))
+            days.append(np.array(columns[3], dtype=np.int8))
+            created.append(np.array(columns[4], dtype='datetime64[us]').view(np.int64))
+        join = lambda parts, dtype: np.concatenate(parts) if parts else np.empty(0, dtype)
+        order = np.lexsort((join(ids, np.int64), join(days, np.int8), join(months, np.int8), join(years, np.int16)))
+        self.ids = join(ids, np.int64)[order]
+        self.years = join(years, np.int16)[order]
+        self.months = join(months, np.int8)[order]
+        self.days = join(days, np.int8)[order]
+        self.created = join(created, np.int64)[order]
+        self.created[self.created == NAT] = NO_TIMESTAMP
+        self.size = len(self.ids)
+        self.keys = _historical_key(self.years.astype(np.int64), self.months.astype(np.int64), self.days.astype(np.int64), self.ids)
+        self.newest = np.lexsort((-self.ids, -self.created)).astype(np.int32)
+
+        by_id = np.argsort(self.ids).astype(np.int32)
+        sorted_ids = self.ids[by_id]
+        members = {}
+        for rows in connection.execute(text('SELECT category_id, event_id FROM event_categories').execution_options(stream_results=True)).partitions(chunk_size):
+            category_ids, event_ids = (np.array(c, dtype=np.int64) for c in zip(*rows))
+            found = np.searchsorted(sorted_ids, event_ids)
+            found[found == self.size] = 0
+            hit = sorted_ids[found] == event_ids if self.size else np.zeros(len(event_ids), bool)
+            for category_id in np.unique(category_ids[hit]):
+                members.setdefault(int(category_id), []).append(by_id[found[hit & (category_ids == category_id)]])
+        self.categories = {}
+        for category_id, positions in members.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[np.concatenate(positions)] = True
+            self.categories[category_id] = np.packbits(mask)
+
+    @property
+    def nbytes(self):
+        arrays = (self.ids, self.years, self.months, self.days, self.created, self.keys, self.newest, *self.categories.values())
+        return sum(a.nbytes for a in arrays)
+
+    def select(self, category_id=None, years=(), month=None, day=None, newest=False, after=None, limit=None):
+        """Event ids matching the filters, in sort order, starting after the `after` cursor values."""
+        mask = np.ones(self.size, dtype=bool)
+        if category_id:
+            bits = self.categories.get(category_id)
+            if bits is None: return []
+            mask &= np.unpackbits(bits, count=self.size).view(bool)
+        if years: mask &= np.isin(self.years, years)
+        if month: mask &= self.months == month
+        if day: mask &= self.days == day
+        if newest:
+            if after is not None:
+                created, event_id = _micros(after[0]), after[1]
+                mask &= (self.created < created) | ((self.created == created) & (self.ids < event_id))
+            positions = self.newest[mask[self.newest]]
+        else:
+            if after is not None: mask &= self.keys > _historical_key(*after)
+            positions = np.flatnonzero(mask)
+        if limit is not None: positions = positions[:limit]
+        return self.ids[positions].tolist()
+
+class ColumnarIndex:
+    """Per-worker columnar snapshot of the events table for list filters and sorts.
+
+    A snapshot goes stale when invalidate() is called in this worker, when a
+    watched response-cache tag moves (tag versions are shared by every worker
+    on the host through the memory backend's TagFile, or through redis), or
+    after `ttl` seconds. Stale snapshots are rebuilt on a
+    background thread and snapshot() returns None meanwhile, so callers fall
+    back to SQL instead of waiting on a full table scan.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.version = 0
+        self.lock = threading.Lock()
+        self._snapshots = {}
+        self._building = set()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _current_version(self):
+        return (self.version, *response_cache.backend.versions(list(WATCHED_TAGS)))
+
+    def snapshot(self):
+        if np is None: raise RuntimeError('EVENTS_COLUMNAR_INDEX needs numpy installed')
+        key = str(db.engine.url)
+        version = self._current_version()
+        cached = self._snapshots.get(key)
+        if cached and cached[0] == version and cached[1] > time.monotonic(): return cached[2]
+        with self.lock:
+            if key not in self._building:
+                self._building.add(key)
+                threading.Thread(target=self._build, args=(current_app._get_current_object(), key, version), daemon=True).start()
+        return None
+
+    def _build(self, app, key, version):
+        try:
+            with app.app_context():
+                snapshot = Snapshot()
+            self._snapshots[key] = (version, time.monotonic() + self.ttl, snapshot)
+        finally:
+            with self.lock: self._building.discard(key)
+
+    def wait(self, timeout=None):
+        """Block until a fresh snapshot is available and return it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (snapshot := self.snapshot()) is None:
+            if deadline is not None and time.monotonic() > deadline: raise TimeoutError('Columnar snapshot build timed out')
+            time.sleep(0.05)
+        return snapshot
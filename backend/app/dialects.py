@@ -0,0 +1,18 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+
+def dialect_insert(table):
+    """INSERT for the bound dialect, with on_conflict_do_nothing/do_update available."""
+    name = db.session.get_bind().dialect.name
+    if name == 'postgresql': return postgresql.insert(table)
+    if name == 'sqlite': return sqlite.insert(table)
+    raise NotImplementedError(f'Bulk upserts are not supported on {name}')
+
+
+def sync_sequences(*models):
+    """Move Postgres serial sequences past rows inserted with explicit ids."""
+    if db.session.get_bind().dialect.name != 'postgresql': return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 1), (SELECT max(id) FROM {table}) IS NOT NULL)"))
@@ -0,0 +1,55 @@
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session # type: ignore
+from sqlalchemy import event
+
+READ_METHODS = ('GET', 'HEAD')
+
+class RoutingSession(Session):
+    """Sends everything a read-only request runs to the 'replica' bind.
+
+    Flushes always go to the primary, as does any request after the client's
+    own write for REPLICA_PIN_SECONDS (see configure_engines).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get('read_replica'):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _request_statement_timeout(session, transaction, connection):
+    # SET LOCAL ends with the transaction, so a pooled connection never carries
+    # the limit into a CLI command; every transaction a request begins gets it.
+    if not has_request_context() or connection.dialect.name != 'postgresql': return
+    timeout = current_app.config.get('DB_STATEMENT_TIMEOUT_MS')
+    if timeout: connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items(): cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+def configure_engines(app, db):
+    """SQLite pragmas on every new connection, and read-replica routing when a 'replica' bind exists."""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engines = db.engines
+        if pragmas:
+            for engine in engines.values():
+                if engine.dialect.name == 'sqlite': event.listen(engine, 'connect', _apply_pragmas(pragmas))
+        if 'replica' not in engines: return
+
+    pin = app.config.get('REPLICA_PIN_SECONDS', 5)
+
+    @app.before_request
+    def route_reads():
+        g.read_replica = request.method in READ_METHODS and session.get('primary_until', 0) < time.time()
+
+    @app.after_request
+    def pin_writer(response):
+        if request.method not in READ_METHODS and request.method != 'OPTIONS' and response.status_code < 400:
+            session['primary_until'] = time.time() + pin
+        return response
@@ -0,0 +1,218 @@
+import calendar
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+import requests # type: ignore
+from requests.adapters import HTTPAdapter # type: ignore
+from sqlalchemy import func
+from . import db, response_cache
+from .bulk import BulkEventWriter
+from .dialects import dialect_insert
+from .models import BackfillDay
+from .tagging import KeywordMatcher
+
+USER_AGENT = 'TechTimeCapsule/1.0 (dev project; contact@example.com)'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class FeedError(Exception):
+    pass
+
+class FeedCache:
+    """Raw feed payloads on disk, one gzipped JSON file per month/day."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, month, day):
+        return os.path.join(self.directory, f'{month:02d}-{day:02d}.json.gz')
+
+    def get(self, month, day):
+        try:
+            with gzip.open(self.path(month, day), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, month, day, payload):
+        path = self.path(month, day)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    def stats(self):
+        files = [e for e in os.scandir(self.directory) if e.name.endswith('.json.gz')]
+        return len(files), sum(e.stat().st_size for e in files)
+
+class FeedFetcher:
+    """Fetches on-this-day feeds over one pooled session from a bounded thread pool.
+
+    With a `cache`, payloads are read from disk when present and stored after
+    every download; `offline=True` never touches the network.
+    """
+
+    def __init__(self, base_url, rate=5.0, workers=8, retries=4, backoff=0.5, timeout=10, cache=None, offline=False):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.offline = offline
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, month, day):
+        if self.cache:
+            payload = self.cache.get(month, day)
+            if payload is not None: return payload
+        if self.offline: raise FeedError(f'{month}/{day} is not in the feed cache')
+        payload = self.download(month, day)
+        if self.cache: self.cache.put(month, day, payload)
+        return payload
+
+    def download(self, month, day):
+        url = f'{self.base_url}/{month}/{day}'
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = FeedError(f'HTTP {response.status_code} from {url}')
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, delay = FeedError(f'{type(e).__name__} fetching {url}'), None
+            except requests.RequestException as e:
+                raise FeedError(str(e)) from e
+            if attempt == self.retries: raise error
+            time.sleep(delay if delay is not None else self.backoff * 2 ** attempt * (1 + random.random()))
+
+    def fetch_all(self, days):
+        """Yield (month, day, payload, error) for each (month, day) as soon as it arrives."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, month, day): (month, day) for month, day in days}
+            for future in as_completed(futures):
+                month, day = futures[future]
+                try:
+                    yield month, day, future.result(), None
+                except Exception as e:
+                    yield month, day, None, e
+
+    def close(self):
+        self.session.close()
+
+def units_in_years(first_year, last_year):
+    """Every (year, month, day) in [first_year, last_year]."""
+    return [(year, month, day) for year in range(first_year, last_year + 1)
+            for month in range(1, 13) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+def units_until(today):
+    start = date(today.year, 1, 1)
+    return [(d.year, d.month, d.day) for d in (start + timedelta(days=i) for i in range((today - start).days + 1))]
+
+def event_rows(month, day, payload, archivist, matcher, category_ids):
+    """Yield (row, links) for the feed entries that mention a tech keyword."""
+    events = payload.get('events', [])
+    for event_data, keywords in zip(events, matcher.match_batch([e['text'] for e in events])):
+        if keywords:
+            page = event_data['pages'][0]
+            row = {'title': page['title'], 'description': event_data['text'], 'year': event_data['year'], 'month': month, 'day': day,
+                   'source_link': page['content_urls']['desktop']['page'], 'user_id': archivist.id}
+            yield row, matcher.links(keywords, category_ids)
+
+def record_units(units, status, error=None):
+    if not units: return
+    stmt = dialect_insert(BackfillDay.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['year', 'month', 'day'],
+        set_={'status': stmt.excluded.status, 'error': stmt.excluded.error,
+              'attempts': BackfillDay.__table__.c.attempts + 1, 'updated_at': func.now()})
+    db.session.execute(stmt, [{'year': y, 'month': m, 'day': d, 'status': status, 'error': error, 'attempts': 1} for y, m, d in units])
+
+def pending_by_day(units, resume=True):
+    """Group the units still to do by the (month, day) feed that covers them."""
+    done = set()
+    if resume and units:
+        years = {y for y, _, _ in units}
+        done = set(db.session.query(BackfillDay.year, BackfillDay.month, BackfillDay.day)
+                   .filter(BackfillDay.status == 'done', BackfillDay.year.between(min(years), max(years))))
+    by_day = {}
+    for unit in units:
+        if unit not in done: by_day.setdefault(unit[1:], []).append(unit)
+    return by_day
+
+def ingest_units(fetcher, units, archivist, matcher=None, batch_size=1000, resume=True):
+    """Backfill (year, month, day) units, fetching each month/day feed once.
+
+    A day's units are checkpointed as done in the same transaction as its last
+    rows, so a restarted run with resume=True skips exactly the finished work.
+    Returns the (month, day) feeds that failed; they are recorded as failed.
+    """
+    matcher = matcher or KeywordMatcher()
+    category_ids = matcher.category_ids()
+    by_day = pending_by_day(units, resume)
+    print(f"{sum(map(len, by_day.values()))} of {len(units)} day(s) to do, {len(by_day)} feed(s) to read")
+    completed, failed = [], []
+
+    def checkpoint(inserted):
+        record_units([unit for key in completed for unit in by_day[key]], 'done')
+        completed.clear()
+
+    with BulkEventWriter(batch_size, before_commit=checkpoint) as writer:
+        for month, day, payload, error in fetcher.fetch_all(by_day):
+            if error is None:
+                try:
+                    rows = list(event_rows(month, day, payload, archivist, matcher, category_ids))
+                except (KeyError, IndexError, TypeError) as e:
+                    error = FeedError(f'Malformed feed entry: {e!r}')
+            if error is not None:
+                print(f"An error occurred for {month}/{day}: {error}")
+                record_units(by_day[(month, day)], 'failed', str(error))
+                db.session.commit()
+                failed.append((month, day))
+                continue
+            # Database errors propagate: a failed batch must stop the run, not drop days.
+            for row, links in rows: writer.add(row, links)
+            completed.append((month, day))
+            print(f"Fetched events for {month}/{day}")
+        if completed and not writer.pending:
+            checkpoint([])
+            db.session.commit()
+    if writer.inserted or writer.linked: response_cache.clear()
+    print(f"Inserted {writer.inserted} new events ({writer.received - writer.inserted} already present), {writer.linked} new category links")
+    return failed
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, request
+from sqlalchemy import event
+from . import db
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.parameter_sets = 0  # an executemany counts once per row it writes
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.parameter_sets += len(parameters) if executemany else 1
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(engine=None):
+    """Count the SQL statements sent to `engine` (the app's engine by default)."""
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+_request_sql = ContextVar('request_sql', default=None)
+
+def _new_route():
+    return {'duration': [0] * (len(LATENCY_BUCKETS) + 1), 'duration_sum': 0.0,
+            'size': [0] * (len(SIZE_BUCKETS) + 1), 'size_sum': 0,
+            'status': {}, 'sql': 0, 'sql_seconds': 0.0, 'heavy': 0}
+
+def _merge(into, routes):
+    for key, route in routes.items():
+        total = into.setdefault(key, _new_route())
+        for field in ('duration', 'size'): total[field] = [a + b for a, b in zip(total[field], route[field])]
+        for field in ('duration_sum', 'size_sum', 'sql', 'sql_seconds', 'heavy'): total[field] += route[field]
+        for status, n in route['status'].items(): total['status'][status] = total['status'].get(status, 0) + n
+    return into
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RequestMetrics:
+    """Per-route latency and response size histograms plus SQL statement counts and time.
+
+    Recording a request is a few dict updates under a lock; SQL is counted by
+    engine cursor events into a per-request context variable. Requests issuing
+    more than METRICS_QUERY_THRESHOLD statements are counted and logged.
+
+    With METRICS_DIR set, each process also dumps its totals to <dir>/<pid>.json
+    at most every METRICS_FLUSH_INTERVAL seconds, and render() sums every file
+    there, so any gunicorn worker can answer for all of them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.flushed = 0.0
+
+    def init_app(self, app):
+        self.threshold = app.config.get('METRICS_QUERY_THRESHOLD', 20)
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+        if self.directory: os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._measure)
+        app.teardown_request(self._finish)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        app.extensions['request_metrics'] = self
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = _request_sql.set([0, 0.0])
+
+    def _measure(self, response):
+        # Streamed bodies have no length yet; they are timed to their last chunk.
+        g.metrics_response = (response.status_code, None if response.is_streamed else response.calculate_content_length())
+        return response
+
+    def _finish(self, exc):
+        started = g.pop('metrics_started', None)
+        if started is None: return
+        statements, sql_seconds = _request_sql.get()
+        _request_sql.reset(g.pop('metrics_token'))
+        status, size = g.pop('metrics_response', (500, None))
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.record(f'{request.method} {route}', time.perf_counter() - started, status, size, statements, sql_seconds)
+        if statements > self.threshold:
+            current_app.logger.warning('%s %s issued %d SQL statements (threshold %d)', request.method, request.full_path.rstrip('?'), statements, self.threshold)
+
+    def record(self, key, seconds, status, size, statements, sql_seconds):
+        with self.lock:
+            route = self.routes.get(key)
+            if route is None: route = self.routes[key] = _new_route()
+            route['duration'][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            route['duration_sum'] += seconds
+            if size is not None:
+                route['size'][bisect_left(SIZE_BUCKETS, size)] += 1
+                route['size_sum'] += size
+            route['status'][str(status)] = route['status'].get(str(status), 0) + 1
+            route['sql'] += statements
+            route['sql_seconds'] += sql_seconds
+            if statements > self.threshold: route['heavy'] += 1
+            flush = self.directory and time.monotonic() - self.flushed > self.flush_interval
+            if flush: self.flushed = time.monotonic()
+        if flush: self.flush()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    def flush(self):
+        with self.lock:
+            payload = json.dumps(self.routes)
+        tmp = f'{self._path(os.getpid())}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f: f.write(payload)
+        os.replace(tmp, self._path(os.getpid()))
+
+    def totals(self):
+        with self.lock:
+            routes = _merge({}, self.routes)
+        if not self.directory: return routes
+        own = f'{os.getpid()}.json'
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json') or entry.name == own: continue
+            try:
+                with open(entry.path) as f: _merge(routes, json.load(f))
+            except (OSError, ValueError):
+                continue  # a worker is mid-replace; its numbers show up next scrape
+        return routes
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        routes = self.totals()
+        lines = []
+        def histogram(name, help_text, field, buckets):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} histogram'])
+            for key, route in sorted(routes.items()):
+                method, path = key.split(' ', 1)
+                labels = f'route="{_label(path)}",method="{method}"'
+                cumulative = 0
+                for bound, n in zip((*buckets, '+Inf'), route[field]):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {route[field + "_sum"]}')
+                lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        def counter(name, help_text, value):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} counter'])
+            for key, route in sorted(routes.items()):
+                method, path = key.split(' ', 1)
+                for extra, n in value(route):
+                    lines.append(f'{name}{{route="{_label(path)}",method="{method}"{extra}}} {n}')
+        histogram('ttc_http_request_duration_seconds', 'Request latency by route.', 'duration', LATENCY_BUCKETS)
+        histogram('ttc_http_response_size_bytes', 'Response body size by route (streamed responses excluded).', 'size', SIZE_BUCKETS)
+        counter('ttc_http_requests_total', 'Requests by route and status.', lambda r: [(f',status="{s}"', n) for s, n in sorted(r['status'].items())])
+        counter('ttc_sql_statements_total', 'SQL statements issued by route.', lambda r: [('', r['sql'])])
+        counter('ttc_sql_duration_seconds_total', 'Time spent executing SQL by route.', lambda r: [('', r['sql_seconds'])])
+        counter('ttc_sql_heavy_requests_total', 'Requests over the SQL statement threshold.', lambda r: [('', r['heavy'])])
+        return '\n'.join(lines) + '\n'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_sql.get() is not None: conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_sql.get()
+    if stats is None: return
+    started = conn.info.get('metrics_started')
+    stats[0] += 1
+    if started: stats[1] += time.perf_counter() - started.pop()
+
+request_metrics = RequestMetrics()
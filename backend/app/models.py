@@ -1,6 +1,8 @@
 from sqlalchemy_serializer import SerializerMixin # type: ignore
+from sqlalchemy import event
 from sqlalchemy.ext.hybrid import hybrid_property
-from . import db, bcrypt
+from sqlalchemy.orm import Session, object_session
+from . import db, password_hasher, response_cache
 
 class User(db.Model, SerializerMixin):
     __tablename__ = 'users'
@@ -17,10 +19,14 @@ class User(db.Model, SerializerMixin):
 
     @password_hash.setter
     def password_hash(self, password):
-        self._password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self._password_hash = password_hasher.hash(password)
 
     def authenticate(self, password):
-        return bcrypt.check_password_hash(self._password_hash, password)
+        # A hash made at an older BCRYPT_LOG_ROUNDS is replaced on a successful
+        # login; the caller commits it.
+        ok, rehashed = password_hasher.verify(self._password_hash, password)
+        if rehashed: self._password_hash = rehashed
+        return ok
 
 class Event(db.Model, SerializerMixin):
     __tablename__ = 'events'
@@ -35,8 +41,14 @@ class Event(db.Model, SerializerMixin):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     user = db.relationship('User', back_populates='events')
-    event_categories = db.relationship('EventCategory', back_populates='event', cascade='all, delete-orphan')
+    event_categories = db.relationship('EventCategory', back_populates='event', cascade='all, delete-orphan', passive_deletes=True)
     serialize_rules = ('-user.events', '-user.categories', '-event_categories.event', 'event_categories.category', 'user.username')
+    __table_args__ = (
+        db.Index('ix_events_year_month_day_id', 'year', 'month', 'day', 'id'),
+        db.Index('ix_events_month_day_year', 'month', 'day', 'year'),
+        db.Index('ix_events_created_at_id', 'created_at', 'id'),
+        db.Index('uq_events_year_month_day_title', 'year', 'month', 'day', 'title', unique=True),
+    )
 
 class Category(db.Model, SerializerMixin):
     __tablename__ = 'categories'
@@ -45,15 +57,72 @@ class Category(db.Model, SerializerMixin):
     description = db.Column(db.Text)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user = db.relationship('User', back_populates='categories')
-    event_categories = db.relationship('EventCategory', back_populates='category', cascade='all, delete-orphan')
+    event_categories = db.relationship('EventCategory', back_populates='category', cascade='all, delete-orphan', passive_deletes=True)
     serialize_rules = ('-user.categories', '-user.events', '-event_categories.category', 'user.username')
 
 class EventCategory(db.Model, SerializerMixin):
     __tablename__ = 'event_categories'
     id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    # ON DELETE CASCADE: deleting an event or category never loads its links
+    # (on SQLite this needs foreign_keys=ON, see config.SQLiteConfig).
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), nullable=False)
     relationship_description = db.Column(db.String(255), nullable=False)
     event = db.relationship('Event', back_populates='event_categories')
     category = db.relationship('Category', back_populates='event_categories')
-    serialize_rules = ('-event.event_categories', '-category.event_categories', 'category.name')
\ No newline at end of file
+    serialize_rules = ('-event.event_categories', '-category.event_categories', 'category.name')
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'category_id', name='uq_event_categories_event_id_category_id'),
+        db.Index('ix_event_categories_category_id_event_id', 'category_id', 'event_id'),
+    )
+
+class BackfillDay(db.Model):
+    __tablename__ = 'backfill_days'
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(10), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+# Timeline aggregates, kept in step with every event/link write (app/stats.py).
+class DayCount(db.Model):
+    __tablename__ = 'stats_day_counts'
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_stats_day_counts_month_day', 'month', 'day'),)
+
+class CategoryYearCount(db.Model):
+    __tablename__ = 'stats_category_counts'
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# check_session serves cached profiles tagged 'users' and 'user:<id>'; drop
+# them once a rename or delete actually commits. Bulk Query.update()/delete()
+# skips the per-object events, so it drops every profile.
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, user):
+    if db.inspect(user).attrs.username.history.has_changes(): _profile_changed(object_session(user), f'user:{user.id}')
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, user):
+    _profile_changed(object_session(user), f'user:{user.id}')
+
+@event.listens_for(Session, 'do_orm_execute')
+def _users_bulk_changed(state):
+    if (state.is_update or state.is_delete) and User.__mapper__ in state.all_mappers: _profile_changed(state.session, 'users')
+
+def _profile_changed(session, tag):
+    session.info.setdefault('changed_profiles', set()).add(tag)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_profiles(session):
+    tags = session.info.pop('changed_profiles', None)
+    if tags: response_cache.invalidate(*tags)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_profiles(session):
+    session.info.pop('changed_profiles', None)
@@ -0,0 +1,109 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import String, literal, tuple_
+from .models import Event
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list): raise InvalidCursor('Cursor must encode a list')
+    return values
+
+def parse_limit(value, default, maximum):
+    if value is None: return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidCursor('limit must be an integer')
+    return max(1, min(limit, maximum))
+
+# Each sort is a keyset: the ordered columns, whether it runs descending, and how
+# to turn a row into cursor values (and back) without losing the type.
+SORTS = {
+    'historical': {
+        'columns': (Event.year, Event.month, Event.day, Event.id),
+        'descending': False,
+        'dump': lambda e: [e.year, e.month, e.day, e.id],
+        'load': lambda v: [int(x) for x in v],
+    },
+    'newest': {
+        'columns': (Event.created_at, Event.id),
+        'descending': True,
+        # created_at is NULL for rows written before it existed; they come last.
+        'nullable': True,
+        'dump': lambda e: [e.created_at.isoformat() if e.created_at else None, e.id],
+        'load': lambda v: [datetime.fromisoformat(v[0]) if v[0] else None, int(v[1])],
+    },
+}
+
+def get_sort(name):
+    return SORTS['newest'] if name == 'newest' else SORTS['historical']
+
+def _bind(value, dialect):
+    # SQLite keeps DateTime as text, and rows stamped by CURRENT_TIMESTAMP have no
+    # fractional part, so compare against the text form they were stored in.
+    if isinstance(value, datetime) and dialect == 'sqlite':
+        fmt = '%Y-%m-%d %H:%M:%S.%f' if value.microsecond else '%Y-%m-%d %H:%M:%S'
+        return literal(value.strftime(fmt), String)
+    return value
+
+def cursor_values(sort, cursor):
+    """The typed keyset values a cursor encodes for `sort`, or None without a cursor."""
+    if not cursor: return None
+    values = decode_cursor(cursor)
+    if len(values) != len(sort['columns']): raise InvalidCursor('Cursor does not match the requested sort')
+    try:
+        return sort['load'](values)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+def _after(columns, values, descending):
+    key = tuple_(*columns)
+    return key < tuple_(*values) if descending else key > tuple_(*values)
+
+def _ordered(query, columns, descending):
+    return query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+def apply_sort(query, sort, cursor=None):
+    """The ordered queries that list `query` from `cursor` on; read them one after another.
+
+    A nullable leading column is NULLS LAST on every backend: first the rows
+    that have a value, in keyset order, then the NULL rows by the remaining
+    columns. Each part is a range on the (created_at, id) index, which a single
+    ORDER BY ... NULLS LAST with an OR in the cursor predicate is not.
+    """
+    columns, descending = sort['columns'], sort['descending']
+    values = cursor_values(sort, cursor)
+    if values is not None:
+        dialect = query.session.get_bind().dialect.name
+        values = [_bind(v, dialect) for v in values]
+    if not sort.get('nullable'):
+        if values is not None: query = query.filter(_after(columns, values, descending))
+        return [_ordered(query, columns, descending)]
+    head, rest = columns[0], columns[1:]
+    nulls = query.filter(head.is_(None))
+    if values is None:
+        return [_ordered(query.filter(head.isnot(None)), columns, descending), _ordered(nulls, rest, descending)]
+    if values[0] is None:
+        return [_ordered(nulls.filter(_after(rest, values[1:], descending)), rest, descending)]
+    return [_ordered(query.filter(_after(columns, values, descending)), columns, descending), _ordered(nulls, rest, descending)]
+
+def paginate(queries, sort, limit):
+    rows = []
+    for query in queries:
+        rows += query.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit: break
+    if len(rows) <= limit: return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort['dump'](rows[-1]))
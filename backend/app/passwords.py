@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+
+class HasherBusy(Exception):
+    """The hashing pool is saturated; the caller should answer 503 rather than queue."""
+
+class HashPool:
+    """A small dedicated bcrypt pool with admission control.
+
+    At most `workers + queue` hashes are admitted at once; past that run()
+    raises HasherBusy immediately instead of letting request threads pile up.
+    workers=0 hashes inline in the calling thread.
+    """
+
+    def __init__(self, workers=2, queue=16, timeout=10.0):
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt') if workers else None
+        self.slots = threading.BoundedSemaphore(workers + queue) if workers else None
+
+    def run(self, fn, *args):
+        if self.executor is None: return fn(*args)
+        if not self.slots.acquire(blocking=False): raise HasherBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+def hash_rounds(stored):
+    try:
+        return int(stored.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """Flask-Bcrypt hashing off the request thread, at the cost in BCRYPT_LOG_ROUNDS."""
+
+    def __init__(self, bcrypt):
+        self.bcrypt = bcrypt
+
+    def init_app(self, app):
+        app.extensions['password_hasher'] = HashPool(app.config.get('PASSWORD_HASH_WORKERS', 2),
+                                                     app.config.get('PASSWORD_HASH_QUEUE', 16),
+                                                     app.config.get('PASSWORD_HASH_TIMEOUT', 10.0))
+
+    @property
+    def pool(self):
+        return current_app.extensions['password_hasher']
+
+    @property
+    def rounds(self):
+        return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+    def _hash(self, password, rounds):
+        return self.bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+    def _verify(self, stored, password, rounds):
+        if not self.bcrypt.check_password_hash(stored, password): return False, None
+        return True, None if hash_rounds(stored) == rounds else self._hash(password, rounds)
+
+    def hash(self, password):
+        return self.pool.run(self._hash, password, self.rounds)
+
+    def verify(self, stored, password):
+        """Return (ok, new_hash); new_hash is set when the stored cost is out of date."""
+        return self.pool.run(self._verify, stored, password, self.rounds)
@@ -1,10 +1,27 @@
-from flask import Blueprint, request, make_response, jsonify, session
-from sqlalchemy.sql.expression import func
-from sqlalchemy.exc import IntegrityError
-from . import db
+import json
+import tempfile
+from flask import Blueprint, Response, current_app, request, make_response, jsonify, session, stream_with_context
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import load_only
+from . import db, response_cache
 from .models import User, Event, Category, EventCategory
+from .bulk import EVENT_NATURAL_KEY, BulkEventWriter
+from .sampling import IdRangeSampler
+from .serializers import category_full, event_detail, event_summary, user_brief, user_full
+from .passwords import HasherBusy
+from .pagination import InvalidCursor, apply_sort, cursor_values, decode_cursor, encode_cursor, get_sort, paginate, parse_limit
+from .columnar import ColumnarIndex
+from .instrumentation import request_metrics
+from .search import search_event_ids
+from .trivia import TriviaDeck
+from .stats import TimelineDelta, forget_category, timeline, unlink_event
+from .uploads import InvalidRow, MalformedUpload, event_row, iter_json_rows
 
 bp = Blueprint('main', __name__)
+event_sampler = IdRangeSampler(Event)
+event_index = ColumnarIndex()
+TRIVIA_CRITERIA = (Event.description.isnot(None), Event.description != '')
+trivia_deck = TriviaDeck(Event, TRIVIA_CRITERIA)
 
 @bp.route('/api/')
 def index():
@@ -22,7 +39,9 @@ def signup():
         db.session.add(user)
         db.session.commit()
         session['user_id'] = user.id
-        return make_response(jsonify(user.to_dict()), 201)
+        return make_response(jsonify(user_full(user)), 201)
+    except HasherBusy:
+        return _busy()
     except IntegrityError:
         db.session.rollback()
         return make_response(jsonify({'error': 'Username already exists'}), 422)
@@ -36,12 +55,26 @@ def login():
     username = data.get('username')
     password = data.get('password')
     if not username or not password: return make_response(jsonify({'error': 'Username and password are required'}), 400)
+    # The bare row is enough to check the password; only a successful sign-in
+    # pays for loading the profile graph.
     user = User.query.filter_by(username=username).first()
-    if user and user.authenticate(password):
+    try:
+        authenticated = user is not None and user.authenticate(password)
+    except HasherBusy:
+        return _busy()
+    if authenticated:
+        if user in db.session.dirty: db.session.commit()
         session['user_id'] = user.id
-        return make_response(jsonify(user.to_dict()), 200)
+        db.session.expire(user)
+        user = User.query.options(*user_full.options).filter_by(id=user.id).one()
+        return make_response(jsonify(user_full(user)), 200)
     return make_response(jsonify({'error': 'Invalid username or password'}), 401)
 
+def _busy():
+    response = make_response(jsonify({'error': 'Too many sign-ins right now, please try again shortly'}), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
 @bp.route('/api/logout', methods=['DELETE'])
 def logout():
     session.pop('user_id', None)
@@ -49,16 +82,21 @@ def logout():
 
 @bp.route('/api/check_session')
 def check_session():
+    # Hit on every page load: serve the profile from the response cache, which
+    # drops it when the user is renamed or deleted (see models.py).
     user_id = session.get('user_id')
-    if user_id:
-        user = User.query.get(user_id)
-        if user: return make_response(jsonify(user.to_dict()), 200)
+    if user_id: return response_cache.respond(['users', f'user:{user_id}'], lambda: _session_profile(user_id), private=True)
+    return make_response(jsonify({}), 204)
+
+def _session_profile(user_id):
+    user = db.session.get(User, user_id)
+    if user: return make_response(jsonify(user_brief(user)), 200)
     return make_response(jsonify({}), 204)
 
 @bp.route('/api/events/featured')
 def featured_events():
-    events = Event.query.order_by(func.random()).limit(20).all()
-    return make_response(jsonify([e.to_dict(rules=('-event_categories',)) for e in events]), 200)
+    events = event_sampler.sample(20, options=event_summary.options)
+    return make_response(jsonify([event_summary(e) for e in events]), 200)
 
 @bp.route('/api/events', methods=['GET', 'POST'])
 def handle_events():
@@ -67,82 +105,292 @@ def handle_events():
         if not user_id: return make_response(jsonify({'error': 'Unauthorized'}), 401)
         data = request.get_json()
         try:
+            categories_data = data.get('categories', [])
+            category_ids = [int(c['category_id']) for c in categories_data]
+            link_error = _link_error(category_ids)
+            if link_error: return make_response(jsonify({'error': link_error}), 400)
             new_event = Event(title=data['title'], description=data['description'],year=data['year'], month=data['month'], day=data['day'],user_id=user_id, source_link=data.get('source_link'),image_url=data.get('image_url'))
             db.session.add(new_event)
-            db.session.commit()
-            categories_data = data.get('categories', [])
-            for cat_data in categories_data:
-                assoc = EventCategory(event_id=new_event.id, category_id=cat_data['category_id'], relationship_description=cat_data['relationship_description'])
+            db.session.flush()
+            for category_id, cat_data in zip(category_ids, categories_data):
+                assoc = EventCategory(event_id=new_event.id, category_id=category_id, relationship_description=cat_data['relationship_description'])
                 db.session.add(assoc)
+            delta = TimelineDelta()
+            delta.add_event(new_event.year, new_event.month, new_event.day, category_ids)
+            delta.apply()
             db.session.commit()
-            return make_response(jsonify(new_event.to_dict()), 201)
+            event_sampler.invalidate()
+            event_index.invalidate()
+            response_cache.invalidate(*_event_tags(new_event, category_ids))
+            return make_response(jsonify(event_detail(new_event)), 201)
+        except IntegrityError as e:
+            db.session.rollback()
+            # Only the natural key is a 422; anything else (a category deleted
+            # since _link_error looked) is a bad request.
+            if _event_exists(data): return make_response(jsonify({'error': 'An event with this title already exists on that date'}), 422)
+            return make_response(jsonify({'error': f'Could not create event: {e.orig}'}), 400)
         except Exception as e:
             db.session.rollback()
             return make_response(jsonify({'error': f'Could not create event: {e}'}), 400)
 
     if request.method == 'GET':
-        query = Event.query
-        args = request.args
-        category_id = args.get('category_id', type=int)
-        if category_id:
-            query = query.join(Event.event_categories).filter(EventCategory.category_id == category_id)
-        
-        years_str = args.get('years')
-        if years_str:
-            year_list = [int(y.strip()) for y in years_str.split(',') if y.strip().isdigit()]
-            if year_list: query = query.filter(Event.year.in_(year_list))
-        else:
-            year = args.get('year', type=int)
-            if year: query = query.filter(Event.year == year)
-        
-        month = args.get('month', type=int)
-        day = args.get('day', type=int)
-        if month: query = query.filter(Event.month == month)
-        if day: query = query.filter(Event.day == day)
-
-        sort_by = args.get('sort')
-        if sort_by == 'newest':
-            query = query.order_by(Event.created_at.desc())
-        else:
-            query = query.order_by(Event.year.asc(), Event.month.asc(), Event.day.asc())
-        
-        events = query.all()
-        return make_response(jsonify([e.to_dict(rules=('-event_categories',)) for e in events]), 200)
+        return response_cache.respond(_list_tags(request.args), _list_events)
+
+def _link_error(category_ids):
+    seen = set()
+    for category_id in category_ids:
+        if category_id in seen: return f'Category {category_id} is listed more than once'
+        seen.add(category_id)
+    missing = seen - {c for (c,) in db.session.query(Category.id).filter(Category.id.in_(seen))} if seen else ()
+    if missing: return f"Unknown category {', '.join(map(str, sorted(missing)))}"
+
+def _event_exists(data):
+    return db.session.query(Event.id).filter_by(**{k: data.get(k) for k in EVENT_NATURAL_KEY}).first() is not None
+
+def _requested_years(args):
+    years_str = args.get('years')
+    if years_str: return [int(y.strip()) for y in years_str.split(',') if y.strip().isdigit()]
+    year = args.get('year', type=int)
+    return [year] if year else []
+
+def _list_tags(args):
+    # A list is only affected by writes to events in one of its years and, when
+    # it filters on one, to its category (deleting a category bumps only that).
+    tags = [f'events:year:{y}' for y in _requested_years(args)]
+    category_id = args.get('category_id', type=int)
+    if category_id: tags.append(f'events:category:{category_id}')
+    return tags or ['events:all']
+
+def _event_tags(event, category_ids):
+    tags = [f'event:{event.id}', 'events:all', f'events:year:{event.year}', 'stats']
+    tags += [f'events:category:{c}' for c in category_ids]
+    if category_ids: tags.append('categories')
+    return tags
+
+def _wants_ndjson(args):
+    return args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+
+def _list_events():
+    if current_app.config['EVENTS_COLUMNAR_INDEX']:
+        snapshot = event_index.snapshot()
+        if snapshot is not None: return _list_events_columnar(snapshot)
+    query = Event.query.options(*event_summary.options)
+    args = request.args
+    category_id = args.get('category_id', type=int)
+    if category_id:
+        query = query.join(Event.event_categories).filter(EventCategory.category_id == category_id)
+
+    year_list = _requested_years(args)
+    if year_list: query = query.filter(Event.year.in_(year_list))
+
+    month = args.get('month', type=int)
+    day = args.get('day', type=int)
+    if month: query = query.filter(Event.month == month)
+    if day: query = query.filter(Event.day == day)
+
+    sort = get_sort(args.get('sort'))
+    try:
+        queries = apply_sort(query, sort, args.get('cursor'))
+        if _wants_ndjson(args): return _stream_events(queries)
+        limit = parse_limit(args.get('limit'), current_app.config['EVENTS_PAGE_SIZE'], current_app.config['EVENTS_MAX_PAGE_SIZE'])
+    except InvalidCursor as e:
+        return make_response(jsonify({'error': f'Invalid pagination parameters: {e}'}), 400)
+
+    events, cursor = paginate(queries, sort, limit)
+    response = make_response(jsonify([event_summary(e) for e in events]), 200)
+    if cursor: response.headers['X-Next-Cursor'] = cursor
+    return response
+
+def _stream_events(queries):
+    # Rows come off a server-side cursor in fixed-size chunks, so memory stays
+    # flat no matter how many events match.
+    chunk = current_app.config['EVENTS_STREAM_CHUNK_SIZE']
+    return _ndjson(e for query in queries for e in query.yield_per(chunk))
+
+def _ndjson(events):
+    def generate():
+        for e in events:
+            yield json.dumps(event_summary(e)) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _list_events_columnar(snapshot):
+    # Same filters, sorts and cursors as the SQL path, answered from the
+    # per-worker snapshot; only the rows being returned are loaded.
+    args = request.args
+    sort = get_sort(args.get('sort'))
+    stream = _wants_ndjson(args)
+    try:
+        after = cursor_values(sort, args.get('cursor'))
+        limit = None if stream else parse_limit(args.get('limit'), current_app.config['EVENTS_PAGE_SIZE'], current_app.config['EVENTS_MAX_PAGE_SIZE'])
+    except InvalidCursor as e:
+        return make_response(jsonify({'error': f'Invalid pagination parameters: {e}'}), 400)
+    ids = snapshot.select(args.get('category_id', type=int), _requested_years(args), args.get('month', type=int), args.get('day', type=int),
+                          newest=args.get('sort') == 'newest', after=after, limit=None if stream else limit + 1)
+    if stream:
+        chunk = current_app.config['EVENTS_STREAM_CHUNK_SIZE']
+        return _ndjson(e for i in range(0, len(ids), chunk) for e in _events_by_id(ids[i:i + chunk]))
+    events = _events_by_id(ids[:limit])
+    response = make_response(jsonify([event_summary(e) for e in events]), 200)
+    if len(ids) > limit and events: response.headers['X-Next-Cursor'] = encode_cursor(sort['dump'](events[-1]))
+    return response
+
+def _events_by_id(ids):
+    by_id = {e.id: e for e in Event.query.options(*event_summary.options).filter(Event.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+@bp.route('/api/events/bulk', methods=['POST'])
+def bulk_create_events():
+    user_id = session.get('user_id')
+    if not user_id: return make_response(jsonify({'error': 'Unauthorized'}), 401)
+    config = current_app.config
+    # Results are spooled (to disk past 1 MiB) and only sent once the upload
+    # has been read, so a client still writing its body can't deadlock on them.
+    results = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+')
+    rows = iter_json_rows(request.stream, max_row_chars=config['BULK_MAX_ROW_CHARS'])
+    counts, error = _bulk_insert(rows, user_id, config['BULK_BATCH_SIZE'], results)
+    head = {**counts, 'error': error} if error else counts
+    results.seek(0)
+
+    def generate():
+        try:
+            yield json.dumps(head)[:-1] + ', "results": ['
+            while chunk := results.read(64 * 1024): yield chunk
+            yield ']}'
+        finally:
+            results.close()
+    return Response(generate(), status=400 if error else 200, mimetype='application/json')
+
+def _bulk_insert(rows, user_id, batch_size, out):
+    """Validate and write uploaded rows in batched transactions; one JSON result per row goes to `out`, in upload order."""
+    category_ids = {c for (c,) in db.session.query(Category.id)}
+    counts = dict.fromkeys(('created', 'duplicate', 'invalid', 'failed'), 0)
+    batch, inserted, tags = [], [], set()
+    writer = BulkEventWriter(batch_size, before_commit=inserted.extend)
+
+    def write(result):
+        out.write((',' if any(counts.values()) else '') + json.dumps(result))
+        counts[result['status']] += 1
+
+    def flush():
+        writer.flush()
+        ids = {tuple(row[1:]): row[0] for row in inserted}
+        for index, key, error in batch:
+            if key is None: write({'index': index, 'status': 'invalid', 'error': error})
+            elif key in ids: write({'index': index, 'status': 'created', 'id': ids.pop(key)})
+            else: write({'index': index, 'status': 'duplicate'})
+        if inserted or writer.linked_event_ids:
+            if inserted: event_sampler.invalidate()
+            event_index.invalidate()
+            response_cache.invalidate('events:all', 'stats', *tags, *(f'event:{i}' for i in writer.linked_event_ids))
+        batch.clear()
+        inserted.clear()
+        tags.clear()
+
+    error = None
+    try:
+        try:
+            for index, value in rows:
+                try:
+                    if isinstance(value, InvalidRow): raise ValueError(value.error)
+                    row, links = event_row(value, user_id, category_ids)
+                except ValueError as e:
+                    batch.append((index, None, str(e)))
+                else:
+                    batch.append((index, tuple(row[k] for k in EVENT_NATURAL_KEY), None))
+                    tags.add(f'events:year:{row["year"]}')
+                    tags.update(f'events:category:{c}' for c in links)
+                    if links: tags.add('categories')
+                    writer.add(row, links)
+                if len(batch) >= batch_size: flush()
+        except MalformedUpload as e:
+            error = str(e)
+        flush()
+    except SQLAlchemyError as e:
+        error = f'Could not write events: {e.__class__.__name__}'
+        for index, key, reason in batch:
+            write({'index': index, 'status': 'failed'} if key else {'index': index, 'status': 'invalid', 'error': reason})
+    return counts, error
+
+@bp.route('/api/events/search')
+def search_events():
+    if not request.args.get('q', '').strip(): return make_response(jsonify({'error': 'A search query (q) is required'}), 400)
+    return response_cache.respond(['events:all'], _search_events)
+
+def _search_events():
+    args = request.args
+    try:
+        limit = parse_limit(args.get('limit'), current_app.config['SEARCH_PAGE_SIZE'], current_app.config['EVENTS_MAX_PAGE_SIZE'])
+        offset = decode_cursor(args['cursor'])[0] if args.get('cursor') else 0
+        if type(offset) is not int or offset < 0: raise InvalidCursor('Cursor offset must be a non-negative integer')
+    except (InvalidCursor, IndexError) as e:
+        return make_response(jsonify({'error': f'Invalid pagination parameters: {e}'}), 400)
+    ids = search_event_ids(args['q'], limit + 1, offset)
+    response = make_response(jsonify([event_summary(e) for e in _events_by_id(ids[:limit])]), 200)
+    if len(ids) > limit: response.headers['X-Next-Cursor'] = encode_cursor([offset + limit])
+    return response
+
+def _event_detail(id):
+    # Deleting a category bumps only its own tag, so the detail also depends on its categories'.
+    event = Event.query.options(*event_detail.options).get_or_404(id)
+    return make_response(jsonify(event_detail(event)), 200), [f'events:category:{ec.category_id}' for ec in event.event_categories]
 
 @bp.route('/api/events/<int:id>', methods=['GET', 'PATCH', 'DELETE'])
 def handle_event_by_id(id):
-    event = Event.query.get_or_404(id)
     if request.method == 'GET':
-        return make_response(jsonify(event.to_dict(rules=('-user.events', '-user.categories', '-event_categories.event'))), 200)
+        return response_cache.respond([f'event:{id}'], lambda: _event_detail(id))
+
+    # DELETE leaves the links unloaded: ON DELETE CASCADE removes them.
+    event = Event.query.options(*event_detail.options).get_or_404(id) if request.method == 'PATCH' else Event.query.get_or_404(id)
 
     user_id = session.get('user_id')
     if not user_id or event.user_id != user_id: return make_response(jsonify({'error': 'Unauthorized'}), 403)
     
     if request.method == 'PATCH':
         data = request.get_json()
+        links = {ec.category_id: ec for ec in event.event_categories}
+        old_tags = _event_tags(event, list(links))
+        delta = TimelineDelta()
+        delta.remove_event(event.year, event.month, event.day, list(links))
         try:
             for key, value in data.items():
                 if key != 'categories': setattr(event, key, value)
-            EventCategory.query.filter_by(event_id=event.id).delete()
-            categories_data = data.get('categories', [])
-            for cat_data in categories_data:
-                assoc = EventCategory(event_id=event.id, category_id=cat_data['category_id'], relationship_description=cat_data['relationship_description'])
-                db.session.add(assoc)
+            if 'categories' in data:
+                # Only the difference is written: unchanged links are left alone.
+                wanted = {int(c['category_id']): c['relationship_description'] for c in data['categories']}
+                for category_id, link in links.items():
+                    if category_id not in wanted: event.event_categories.remove(link)
+                    elif link.relationship_description != wanted[category_id]: link.relationship_description = wanted[category_id]
+                for category_id, description in wanted.items():
+                    if category_id not in links: event.event_categories.append(EventCategory(category_id=category_id, relationship_description=description))
+            category_ids = [ec.category_id for ec in event.event_categories]
+            delta.add_event(event.year, event.month, event.day, category_ids)
+            delta.apply()
             db.session.commit()
-            return make_response(jsonify(event.to_dict()), 200)
+            event_index.invalidate()
+            response_cache.invalidate(*old_tags, *_event_tags(event, category_ids))
+            return make_response(jsonify(event_detail(event)), 200)
         except Exception as e:
             db.session.rollback()
             return make_response(jsonify({'error': f'Could not update event: {e}'}), 400)
 
     elif request.method == 'DELETE':
+        category_ids = [c for (c,) in db.session.query(EventCategory.category_id).filter_by(event_id=id)]
+        tags = _event_tags(event, category_ids)
+        delta = TimelineDelta()
+        delta.remove_event(event.year, event.month, event.day)
+        delta.apply()
+        unlink_event(event.id, event.year)
         db.session.delete(event)
         db.session.commit()
+        event_sampler.invalidate()
+        event_index.invalidate()
+        response_cache.invalidate(*tags)
         return make_response(jsonify({}), 204)
 
 @bp.route('/api/categories', methods=['GET', 'POST'])
 def handle_categories():
     if request.method == 'GET':
-        return make_response(jsonify([c.to_dict() for c in Category.query.order_by(Category.name).all()]), 200)
+        return response_cache.respond(['categories'], lambda: make_response(jsonify([category_full(c) for c in Category.query.options(*category_full.options).order_by(Category.name).all()]), 200))
     elif request.method == 'POST':
         user_id = session.get('user_id')
         if not user_id: return make_response(jsonify({'error': 'Unauthorized'}), 401)
@@ -151,7 +399,8 @@ def handle_categories():
             new_category = Category(name=data['name'], description=data.get('description'), user_id=user_id)
             db.session.add(new_category)
             db.session.commit()
-            return make_response(jsonify(new_category.to_dict()), 201)
+            response_cache.invalidate('categories')
+            return make_response(jsonify(category_full(new_category)), 201)
         except Exception as e: return make_response(jsonify({'error': str(e)}), 400)
 
 @bp.route('/api/categories/<int:id>', methods=['DELETE'])
@@ -160,11 +409,50 @@ def delete_category(id):
     user_id = session.get('user_id')
     if not user_id or category.user_id != user_id: return make_response(jsonify({'error': 'Unauthorized'}), 403)
     db.session.delete(category)
+    forget_category(id)
     db.session.commit()
+    event_index.invalidate()
+    response_cache.invalidate('categories', 'stats', f'events:category:{id}')
     return make_response(jsonify({}), 204)
 
 @bp.route('/api/trivia')
 def get_trivia():
-    event = Event.query.filter(Event.description.isnot(None)).order_by(func.random()).first()
-    if not event: return make_response(jsonify({'error': 'No events available for trivia'}), 404)
-    return make_response(jsonify({'description': event.description, 'correct_year': event.year}), 200)
\ No newline at end of file
+    # ?n= returns a list of up to TRIVIA_MAX_BATCH questions; without it, one question object.
+    batch = 'n' in request.args
+    n = request.args.get('n', type=int) if batch else 1
+    if n is None or n < 1: return make_response(jsonify({'error': 'n must be a positive integer'}), 400)
+    events = _deal_trivia(min(n, current_app.config['TRIVIA_MAX_BATCH']))
+    if not events: return make_response(jsonify({'error': 'No events available for trivia'}), 404)
+    questions = [{'description': e.description, 'correct_year': e.year} for e in events]
+    return make_response(jsonify(questions if batch else questions[0]), 200)
+
+def _deal_trivia(n):
+    trivia_deck.ttl = current_app.config['TRIVIA_DECK_TTL']
+    events, dealt, rebuilt = [], set(), False
+    # Ids deleted or edited out of the criteria since the deck was built don't
+    # load; deal others in their place until n load or the deck is used up.
+    while len(events) < n:
+        ids, session['trivia'] = trivia_deck.deal(session.get('trivia'), n - len(events), exclude=dealt)
+        if not ids: break
+        dealt.update(ids)
+        by_id = {e.id: e for e in Event.query.options(load_only(Event.id, Event.description, Event.year)).filter(Event.id.in_(ids), *TRIVIA_CRITERIA)}
+        events += [by_id[i] for i in ids if i in by_id]
+        if not by_id and not rebuilt:
+            # None of them left: the deck is stale (e.g. reseeded), so rebuild it once.
+            trivia_deck.invalidate()
+            dealt, rebuilt = {e.id for e in events}, True
+    return events
+
+@bp.route('/api/stats/timeline')
+def stats_timeline():
+    # Reads the aggregate tables only. `year` narrows the month and category
+    # histograms, `category_id` switches the year histogram to that category,
+    # and `month` with `day` adds per-year "on this day" counts.
+    args = request.args
+    return response_cache.respond(['stats'], lambda: make_response(jsonify(timeline(
+        args.get('year', type=int), args.get('category_id', type=int), args.get('month', type=int), args.get('day', type=int))), 200))
+
+@bp.route('/api/metrics')
+def metrics():
+    if 'request_metrics' not in current_app.extensions: return make_response(jsonify({'error': 'Metrics are disabled'}), 404)
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
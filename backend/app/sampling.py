@@ -0,0 +1,59 @@
+import random
+import time
+from sqlalchemy.sql.expression import func
+from . import db
+
+class IdRangeSampler:
+    """Uniform random rows without ORDER BY random().
+
+    Candidate ids are drawn without replacement from a cached [min, max] id range
+    and looked up through the primary key; ids that were deleted or fail the
+    criteria are rejected, so every matching row is equally likely to be picked.
+    """
+
+    def __init__(self, model, ttl=60, max_rounds=4):
+        self.model = model
+        self.ttl = ttl
+        self.max_rounds = max_rounds
+        self.rng = random.Random()
+        self._bounds = {}
+
+    def invalidate(self):
+        self._bounds.clear()
+
+    def bounds(self):
+        key = str(db.engine.url)
+        cached = self._bounds.get(key)
+        if cached and cached[3] > time.monotonic(): return cached[:3]
+        pk = self.model.id
+        low, high, count = db.session.query(func.min(pk), func.max(pk), func.count(pk)).one()
+        self._bounds[key] = (low, high, count, time.monotonic() + self.ttl)
+        return low, high, count
+
+    def sample(self, n, criteria=(), options=()):
+        low, high, count = self.bounds()
+        if not count: return []
+        pk = self.model.id
+        span = high - low + 1
+        if n * 4 >= count:  # small tables: sorting a handful of rows is cheaper
+            return self.model.query.options(*options).filter(*criteria).order_by(func.random()).limit(n).all()
+
+        density = count / span
+        tried, picked = set(), []
+        for _ in range(self.max_rounds):
+            need = n - len(picked)
+            draw = min(span - len(tried), int(need / density * 2) + 8)
+            candidates = []
+            while len(candidates) < draw:
+                candidate = self.rng.randint(low, high)
+                if candidate not in tried:
+                    tried.add(candidate)
+                    candidates.append(candidate)
+            rows = {row.id: row for row in self.model.query.options(*options).filter(pk.in_(candidates), *criteria)}
+            picked.extend(rows[c] for c in candidates if c in rows)
+            if len(picked) >= n or len(tried) >= span: return picked[:n]
+
+        # Criteria this selective leave the id range too sparse to hit by chance.
+        picked_ids = [row.id for row in picked]
+        rest = self.model.query.options(*options).filter(*criteria, pk.notin_(picked_ids)).order_by(func.random()).limit(n - len(picked)).all()
+        return picked + rest
@@ -0,0 +1,78 @@
+import re
+from sqlalchemy import DDL, event, text
+from . import db
+from .models import Event
+
+# The index lives in the database and is maintained by triggers, so every
+# write path (routes, bulk importer, raw SQL) keeps it in sync.
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "title, description, content='events', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE OF title, description ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+POSTGRES_DDL = (
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE OR REPLACE FUNCTION events_search_vector_update() RETURNS trigger AS $$ BEGIN "
+    "NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B'); RETURN NEW; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS events_search_vector_trg ON events",
+    "CREATE TRIGGER events_search_vector_trg BEFORE INSERT OR UPDATE OF title, description ON events "
+    "FOR EACH ROW EXECUTE FUNCTION events_search_vector_update()",
+    "CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)",
+)
+
+# Databases built with db.create_all() (benchmarks, scratch setups) get the
+# same index the migration creates.
+for statement in SQLITE_DDL:
+    event.listen(Event.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(Event.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+event.listen(Event.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS events_fts').execute_if(dialect='sqlite'))
+
+def _terms(q):
+    return re.findall(r'\w+', q.lower())[:16]
+
+def search_event_ids(q, limit, offset=0):
+    """Ranked event ids matching every word of `q`; the last word may be a prefix."""
+    terms = _terms(q)
+    if not terms: return []
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{t}"' for t in terms) + '*'
+        sql = ("SELECT rowid FROM events_fts WHERE events_fts MATCH :q "
+               "ORDER BY bm25(events_fts, 10.0, 1.0), rowid LIMIT :limit OFFSET :offset")
+    elif dialect == 'postgresql':
+        match = ' & '.join(terms) + ':*'
+        sql = ("SELECT id FROM events, to_tsquery('english', :q) AS query WHERE search_vector @@ query "
+               "ORDER BY ts_rank_cd(search_vector, query) DESC, id LIMIT :limit OFFSET :offset")
+    else:
+        raise NotImplementedError(f'Full-text search is not supported on {dialect}')
+    return [row[0] for row in db.session.execute(text(sql), {'q': match, 'limit': limit, 'offset': offset})]
+
+def suspend_search_index():
+    """Drop the per-row index maintenance before a bulk load; rebuild_search_index() restores it."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('events_fts_ai', 'events_fts_ad', 'events_fts_au'): db.session.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+    elif dialect == 'postgresql':
+        db.session.execute(text('DROP TRIGGER IF EXISTS events_search_vector_trg ON events'))
+        db.session.execute(text('DROP INDEX IF EXISTS ix_events_search_vector'))
+
+def rebuild_search_index():
+    """Re-derive the whole index from the events table in one statement and reinstall its triggers."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        db.session.execute(text("INSERT INTO events_fts(events_fts) VALUES ('rebuild')"))
+        for statement in SQLITE_DDL: db.session.execute(text(statement))
+    elif dialect == 'postgresql':
+        db.session.execute(text("UPDATE events SET search_vector = "
+                                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                                "setweight(to_tsvector('english', coalesce(description, '')), 'B')"))
+        for statement in POSTGRES_DDL: db.session.execute(text(statement))
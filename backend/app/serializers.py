@@ -0,0 +1,75 @@
+"""Hand-compiled replacements for SerializerMixin.to_dict on the hot endpoints.
+
+Each serializer is built once at import for one model and one rule set, so a
+request only pays for attribute reads; the JSON shapes match what
+to_dict(rules=...) produced for the same call sites in routes.py.
+"""
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import joinedload, subqueryload
+from .models import User, Event, Category, EventCategory
+
+# sqlalchemy_serializer's default datetime format.
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _format_datetime(value):
+    return value.strftime(DATETIME_FORMAT)
+
+def _loader_options(model, one, many, parent=None):
+    # Scalar relationships ride along in the same SELECT; collections get one
+    # extra SELECT per level, however many rows the parent query returns
+    # (selectinload would split large parents into chunks of 500 ids).
+    for relations, loader in ((one, joinedload), (many, subqueryload)):
+        for key, child in relations:
+            attr = getattr(model, key)
+            option = loader(attr) if parent is None else getattr(parent, loader.__name__)(attr)
+            yield option
+            yield from _loader_options(child.model, child.one, child.many, option)
+
+def compile_serializer(model, only=None, one=None, many=None):
+    """Build obj -> dict for `model`'s public columns plus nested relationships.
+
+    The returned function carries `.options`: the loader options that fetch
+    exactly the relationships it walks, for use as query.options(*fn.options).
+    """
+    plain, converted = [], []
+    for attr in inspect(model).column_attrs:
+        if attr.key.startswith('_') or (only and attr.key not in only): continue
+        if isinstance(attr.columns[0].type, DateTime): converted.append((attr.key, _format_datetime))
+        else: plain.append(attr.key)
+    plain, converted = tuple(plain), tuple(converted)
+    one, many = tuple((one or {}).items()), tuple((many or {}).items())
+
+    def serialize(obj):
+        data = {key: getattr(obj, key) for key in plain}
+        for key, convert in converted:
+            value = getattr(obj, key)
+            data[key] = None if value is None else convert(value)
+        for key, child in one:
+            value = getattr(obj, key)
+            data[key] = None if value is None else child(value)
+        for key, child in many:
+            data[key] = [child(item) for item in getattr(obj, key)]
+        return data
+
+    serialize.model, serialize.one, serialize.many = model, one, many
+    serialize.options = tuple(_loader_options(model, one, many))
+    return serialize
+
+user_brief = compile_serializer(User, only=('id', 'username'))
+category_brief = compile_serializer(Category, one={'user': user_brief})
+link_with_category = compile_serializer(EventCategory, one={'category': category_brief})
+
+# Event.to_dict(rules=('-event_categories',)): list, featured
+event_summary = compile_serializer(Event, one={'user': user_brief})
+# Event.to_dict() and the detail rule set, which render identically
+event_detail = compile_serializer(Event, one={'user': user_brief}, many={'event_categories': link_with_category})
+
+link_with_event = compile_serializer(EventCategory, one={'event': event_summary})
+# Category.to_dict()
+category_full = compile_serializer(Category, one={'user': user_brief}, many={'event_categories': link_with_event})
+
+# User.to_dict(): signup, login, check_session
+user_full = compile_serializer(User, many={
+    'events': compile_serializer(Event, many={'event_categories': link_with_category}),
+    'categories': compile_serializer(Category, many={'event_categories': link_with_event}),
+})
@@ -0,0 +1,149 @@
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from . import db
+from .dialects import sync_sequences
+from .models import User, Category, Event, EventCategory
+from .search import rebuild_search_index, suspend_search_index
+from .stats import rebuild_stats
+
+FORMAT = 'tech-time-capsule-snapshot'
+VERSION = 1
+MODELS = (User, Category, Event, EventCategory)  # parents first, so foreign keys hold at every step
+
+class SnapshotError(Exception):
+    pass
+
+def _schema_revision():
+    if not inspect(db.session.connection()).has_table('alembic_version'): return None
+    return db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+
+def _plain(value):
+    # One text form for timestamps whichever backend they come from; both
+    # SQLite's DateTime type and Postgres COPY read it back.
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if isinstance(value, datetime) else value
+
+def export_snapshot(path, chunk_size=50_000):
+    """Write users, categories, events and links to a gzipped snapshot; returns rows per table.
+
+    The file is JSON lines: a header, then per table a {"table", "columns"}
+    line, chunk lines of up to `chunk_size` rows (lists in column order) and
+    an {"end", "rows"} line, and finally an end-of-snapshot line with every
+    count, so truncated files are caught on import. All tables are read in
+    one transaction, so the snapshot is consistent.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql': connection.exec_driver_sql('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+    elif connection.dialect.name == 'sqlite': connection.exec_driver_sql('BEGIN')
+    counts = {}
+    try:
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            header = {'format': FORMAT, 'version': VERSION, 'schema_revision': _schema_revision(),
+                      'dialect': connection.dialect.name, 'created_at': datetime.now(timezone.utc).isoformat()}
+            f.write(json.dumps(header) + '\n')
+            for model in MODELS:
+                table = model.__table__
+                columns = [c.name for c in table.columns]
+                f.write(json.dumps({'table': table.name, 'columns': columns}) + '\n')
+                query = text(f"SELECT {', '.join(columns)} FROM {table.name} ORDER BY id").execution_options(stream_results=True)
+                n = 0
+                for rows in connection.execute(query).partitions(chunk_size):
+                    f.write(json.dumps([[_plain(v) for v in row] for row in rows]) + '\n')
+                    n += len(rows)
+                f.write(json.dumps({'end': table.name, 'rows': n}) + '\n')
+                counts[table.name] = n
+            f.write(json.dumps({'end_of_snapshot': True, 'tables': counts}) + '\n')
+    finally:
+        db.session.rollback()
+    return counts
+
+def _copy_text(value):
+    if value is None: return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _load_chunk(dbapi_connection, dialect, table, columns, rows):
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect == 'postgresql':
+            data = io.StringIO(''.join('\t'.join(map(_copy_text, row)) + '\n' for row in rows))
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+        else:
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+    finally:
+        cursor.close()
+
+def _lines(f):
+    for line in f:
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise SnapshotError(f'Corrupt snapshot line: {e}')
+
+def import_snapshot(path, replace=False, log=print):
+    """Bulk-load a snapshot written by export_snapshot(); returns rows per table.
+
+    Rows go in with COPY on Postgres and executemany on SQLite. Secondary
+    indexes and the full-text triggers are dropped first and rebuilt once at
+    the end, and so are the timeline aggregates. Everything runs in one
+    transaction, so a failed import leaves the database as it was. The tables
+    have to be empty unless `replace` is set.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect not in ('postgresql', 'sqlite'): raise SnapshotError(f'Snapshots can not be imported into {dialect}')
+    if dialect == 'sqlite': connection.exec_driver_sql('BEGIN')
+    tables = {model.__tablename__: model.__table__ for model in MODELS}
+    indexes = [index for table in tables.values() for index in table.indexes]
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = _lines(f)
+            header = next(lines, None)
+            if not isinstance(header, dict) or header.get('format') != FORMAT: raise SnapshotError(f'{path} is not a snapshot')
+            if header.get('version') != VERSION: raise SnapshotError(f"Snapshot format version {header.get('version')} is not supported (expected {VERSION})")
+            if header.get('schema_revision') != _schema_revision():
+                log(f"Warning: snapshot schema revision {header.get('schema_revision')} differs from the database's {_schema_revision()}")
+
+            suspend_search_index()
+            if replace:
+                if dialect == 'postgresql':
+                    db.session.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY"))
+                else:
+                    for name in reversed(list(tables)): db.session.execute(text(f'DELETE FROM {name}'))
+            elif any(db.session.execute(text(f'SELECT 1 FROM {name} LIMIT 1')).first() for name in tables):
+                raise SnapshotError('The database already has data; pass --replace to overwrite it')
+
+            for index in indexes: index.drop(connection, checkfirst=True)
+            dbapi_connection = connection.connection.dbapi_connection
+            counts, table, done = {}, None, False
+            for line in lines:
+                if isinstance(line, list):
+                    if table is None: raise SnapshotError('Rows before a table header')
+                    _load_chunk(dbapi_connection, dialect, table, columns, line)
+                    counts[table] += len(line)
+                elif 'table' in line:
+                    table, columns = line['table'], line['columns']
+                    if table not in tables: raise SnapshotError(f'Unknown table {table}')
+                    missing = set(columns) - set(tables[table].columns.keys())
+                    if missing: raise SnapshotError(f"{table} has no column(s) {', '.join(sorted(missing))}")
+                    counts[table] = 0
+                    log(f'Loading {table}...')
+                elif 'end' in line:
+                    if line['end'] != table or line['rows'] != counts[table]: raise SnapshotError(f'{table}: expected {line["rows"]} rows, read {counts.get(table)}')
+                    table = None
+                elif line.get('end_of_snapshot'):
+                    if line['tables'] != counts: raise SnapshotError('Snapshot table counts do not match its contents')
+                    done = True
+            if not done: raise SnapshotError('Snapshot is truncated')
+
+            log('Rebuilding indexes...')
+            for index in indexes: index.create(connection)
+            rebuild_search_index()
+            rebuild_stats()
+            sync_sequences(User, Category, Event, EventCategory)
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    return counts
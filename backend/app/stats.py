@@ -0,0 +1,87 @@
+from collections import Counter
+from sqlalchemy import delete, func, insert, select, update
+from . import db
+from .dialects import dialect_insert
+from .models import CategoryYearCount, DayCount, Event, EventCategory
+
+class TimelineDelta:
+    """Changes to the timeline aggregates, collected by a writer and applied in its transaction.
+
+        delta = TimelineDelta()
+        delta.add_event(1998, 9, 4, category_ids=[3])
+        delta.apply()
+    """
+
+    def __init__(self):
+        self.days = Counter()
+        self.categories = Counter()
+
+    def add_event(self, year, month, day, category_ids=(), sign=1):
+        self.days[(year, month, day)] += sign
+        self.add_links(year, category_ids, sign)
+
+    def add_links(self, year, category_ids, sign=1):
+        for category_id in category_ids: self.categories[(category_id, year)] += sign
+
+    def remove_event(self, year, month, day, category_ids=()):
+        self.add_event(year, month, day, category_ids, sign=-1)
+
+    def apply(self):
+        _add_counts(DayCount, ('year', 'month', 'day'), self.days)
+        _add_counts(CategoryYearCount, ('category_id', 'year'), self.categories)
+        self.days.clear()
+        self.categories.clear()
+
+def _add_counts(model, key_columns, counts):
+    rows = [{**dict(zip(key_columns, key)), 'count': n} for key, n in counts.items() if n]
+    if not rows: return
+    stmt = dialect_insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_={'count': model.__table__.c.count + stmt.excluded.count})
+    db.session.execute(stmt, rows)
+
+def unlink_event(event_id, year):
+    """Take every link of one event out of the per-category counts with a single UPDATE; run before the links go."""
+    table = CategoryYearCount.__table__
+    linked = select(EventCategory.category_id).where(EventCategory.event_id == event_id)
+    db.session.execute(update(table).where(table.c.year == year, table.c.category_id.in_(linked)).values(count=table.c.count - 1))
+
+def forget_category(category_id):
+    db.session.execute(delete(CategoryYearCount).where(CategoryYearCount.category_id == category_id))
+
+def rebuild_stats():
+    """Recompute both aggregate tables from events and event_categories; the caller commits."""
+    db.session.execute(delete(DayCount))
+    db.session.execute(delete(CategoryYearCount))
+    db.session.execute(insert(DayCount).from_select(
+        ['year', 'month', 'day', 'count'],
+        select(Event.year, Event.month, Event.day, func.count()).group_by(Event.year, Event.month, Event.day)))
+    db.session.execute(insert(CategoryYearCount).from_select(
+        ['category_id', 'year', 'count'],
+        select(EventCategory.category_id, Event.year, func.count()).join(Event, Event.id == EventCategory.event_id)
+        .group_by(EventCategory.category_id, Event.year)))
+
+def timeline(year=None, category_id=None, month=None, day=None):
+    """Histograms read from the aggregates; their size is bounded by distinct days, not events."""
+    if category_id:
+        by_year = (db.session.query(CategoryYearCount.year, CategoryYearCount.count)
+                   .filter(CategoryYearCount.category_id == category_id).order_by(CategoryYearCount.year))
+    else:
+        by_year = db.session.query(DayCount.year, func.sum(DayCount.count)).group_by(DayCount.year).order_by(DayCount.year)
+    months = db.session.query(DayCount.month, func.sum(DayCount.count)).group_by(DayCount.month).order_by(DayCount.month)
+    categories = (db.session.query(CategoryYearCount.category_id, func.sum(CategoryYearCount.count))
+                  .group_by(CategoryYearCount.category_id).order_by(CategoryYearCount.category_id))
+    if year:
+        months = months.filter(DayCount.year == year)
+        categories = categories.filter(CategoryYearCount.year == year)
+    years = [{'year': y, 'count': int(n)} for y, n in by_year if n]
+    result = {
+        'total': sum(y['count'] for y in years if not year or y['year'] == year),
+        'years': years,
+        'months': [{'month': m, 'count': int(n)} for m, n in months if n],
+        'categories': [{'category_id': c, 'count': int(n)} for c, n in categories if n],
+    }
+    if month and day:
+        on_this_day = (db.session.query(DayCount.year, DayCount.count)
+                       .filter(DayCount.month == month, DayCount.day == day).order_by(DayCount.year))
+        result['on_this_day'] = [{'year': y, 'count': n} for y, n in on_this_day if n]
+    return result
@@ -0,0 +1,51 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from . import db, password_hasher
+from .dialects import sync_sequences
+from .models import User, Event, Category, EventCategory
+from .stats import rebuild_stats
+
+WORDS = ('computer', 'internet', 'software', 'launch', 'company', 'network', 'space', 'robot', 'chip',
+         'history', 'first', 'released', 'announced', 'founded', 'record', 'market', 'system', 'device')
+SYNTHETIC_PASSWORD = 'synthetic'
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+def generate(users=10, categories=20, events=10_000, links_per_event=1, seed=0, batch_size=10_000):
+    """Bulk-insert a reproducible synthetic dataset next to whatever is already stored.
+
+    Every user's password is SYNTHETIC_PASSWORD. Ids continue from the current
+    maximum, so on an empty database they run 1..n and the same seed always
+    produces the same rows. The timeline aggregates are rebuilt at the end.
+    Returns the number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    password = password_hasher.hash(SYNTHETIC_PASSWORD)
+    first_user, first_category, first_event = _next_id(User), _next_id(Category), _next_id(Event)
+    user_ids = range(first_user, first_user + users)
+    category_ids = range(first_category, first_category + categories)
+    db.session.execute(insert(User), [{'id': i, 'username': f'synthetic{i}', '_password_hash': password} for i in user_ids])
+    db.session.execute(insert(Category), [{'id': i, 'name': f'Synthetic category {i}', 'description': 'Synthetic',
+                                           'user_id': rng.choice(user_ids)} for i in category_ids])
+    start = datetime(2020, 1, 1)
+    links_per_event = min(links_per_event, categories)
+    n_links = 0
+    for first_id in range(first_event, first_event + events, batch_size):
+        event_rows, link_rows = [], []
+        for event_id in range(first_id, min(first_id + batch_size, first_event + events)):
+            event_rows.append({'id': event_id, 'title': f'Event {event_id}', 'description': ' '.join(rng.choice(WORDS) for _ in range(12)),
+                               'year': rng.randint(1950, 2024), 'month': rng.randint(1, 12), 'day': rng.randint(1, 28),
+                               'source_link': f'https://example.com/{event_id}', 'user_id': rng.choice(user_ids),
+                               'created_at': start + timedelta(seconds=event_id)})
+            for category_id in rng.sample(category_ids, links_per_event):
+                link_rows.append({'event_id': event_id, 'category_id': category_id, 'relationship_description': 'Synthetic link'})
+        db.session.execute(insert(Event), event_rows)
+        if link_rows: db.session.execute(insert(EventCategory), link_rows)
+        db.session.commit()
+        n_links += len(link_rows)
+    sync_sequences(User, Category, Event)
+    rebuild_stats()
+    db.session.commit()
+    return {'users': users, 'categories': categories, 'events': events, 'event_categories': n_links}
@@ -0,0 +1,65 @@
+import re
+from bisect import bisect_right
+from . import db
+from .models import Category
+
+# Importer keywords and the category each one tags. Keywords mapped to None
+# still qualify an event as tech history but add no category link.
+KEYWORD_CATEGORIES = {
+    'computer': 'Computing Hardware',
+    'semiconductor': 'Computing Hardware',
+    'chip': 'Computing Hardware',
+    'robot': 'Computing Hardware',
+    'internet': 'World Wide Web',
+    'web': 'World Wide Web',
+    'apple': 'Company Milestones',
+    'microsoft': 'Company Milestones',
+    'google': 'Company Milestones',
+    'nasa': 'Space Exploration',
+    'space': 'Space Exploration',
+    'software': None,
+}
+
+class KeywordMatcher:
+    """All keywords in one compiled alternation, matched in a single pass.
+
+    Matches must start on a word boundary but may run on, so 'web' finds
+    'websites' and 'space' finds 'spacecraft' but 'apple' skips 'pineapple'.
+    """
+
+    def __init__(self, keyword_categories=KEYWORD_CATEGORIES):
+        self.keyword_categories = {k.lower(): v for k, v in keyword_categories.items()}
+        keywords = sorted(self.keyword_categories, key=len, reverse=True)
+        alternation = '|'.join(re.escape(k) for k in keywords)
+        # Texts are lower-cased up front (cheaper than re.IGNORECASE) and the
+        # lookahead lets the scanner skip positions no keyword can start at.
+        first_chars = re.escape(''.join(sorted({k[0] for k in keywords})))
+        self.regex = re.compile(rf'\b(?=[{first_chars}])(?:{alternation})')
+
+    def match(self, text):
+        return set(self.regex.findall(text.lower()))
+
+    def match_batch(self, texts):
+        """Keyword sets for every text, from one scan over the whole batch."""
+        lowered = [text.lower() for text in texts]
+        offsets, position = [], 0
+        for text in lowered:
+            offsets.append(position)
+            position += len(text) + 1
+        results = [set() for _ in texts]
+        for m in self.regex.finditer('\0'.join(lowered)):
+            results[bisect_right(offsets, m.start()) - 1].add(m.group(0))
+        return results
+
+    def category_ids(self):
+        """keyword -> Category.id for the mapped categories that exist in the database."""
+        names = {name for name in self.keyword_categories.values() if name}
+        ids = dict(db.session.query(Category.name, Category.id).filter(Category.name.in_(names)))
+        return {k: ids[name] for k, name in self.keyword_categories.items() if name in ids}
+
+    def links(self, keywords, category_ids):
+        """category_id -> relationship description for one event's matched keywords."""
+        links = {}
+        for keyword in sorted(keywords):
+            if keyword in category_ids: links.setdefault(category_ids[keyword], f"Auto-tagged: mentions '{keyword}'")
+        return links
@@ -0,0 +1,110 @@
+import bisect
+import random
+import threading
+import time
+from array import array
+from . import db
+
+MASK64 = (1 << 64) - 1
+
+def _mix(x, key):
+    # splitmix64's finalizer: every output bit depends on every input bit.
+    x = (x + key) * 0x9E3779B97F4A7C15 & MASK64
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & MASK64
+    return x ^ (x >> 31)
+
+def permute(index, size, key):
+    """Map index in [0, size) to a position in [0, size); a bijection chosen by `key`.
+
+    A four-round Feistel network over the next even power of two, cycle-walked
+    back into range, so it needs no table however large `size` is.
+    """
+    if size <= 1: return index
+    half = ((size - 1).bit_length() + 1) // 2
+    mask = (1 << half) - 1
+    while True:
+        left, right = index >> half, index & mask
+        for round_key in range(key, key + 4):
+            left, right = right, left ^ (_mix(right, round_key) & mask)
+        index = (left << half) | right
+        if index < size: return index
+
+class TriviaDeck:
+    """The sorted ids of every trivia-eligible row, shared by all players in a worker.
+
+    A player walks a range of ids [lo, hi) in a pseudo-random order picked by
+    their `key`, and only carries {lo, hi, key, pos}. Ids only grow, so the
+    same state means the same sequence in every worker and across rebuilds:
+    ids that aren't in the deck (deleted, or no longer eligible) are skipped,
+    and rows added since the walk began become a new range [hi, top) that the
+    player is dealt before anything repeats. The deck is rebuilt after `ttl`
+    seconds; rows removed since are skipped by the caller, which checks every
+    row it is dealt and deals again, excluding them, in their place.
+    """
+
+    def __init__(self, model, criteria=(), ttl=600):
+        self.model = model
+        self.criteria = criteria
+        self.ttl = ttl
+        self.rng = random.Random()
+        self.lock = threading.Lock()
+        self._decks = {}
+
+    def invalidate(self):
+        self._decks.clear()
+
+    def deck(self):
+        """The eligible ids for the current database, ascending; rebuilt when older than `ttl`."""
+        key = str(db.engine.url)
+        cached = self._decks.get(key)
+        if cached and cached[1] > time.monotonic(): return cached[0]
+        with self.lock:
+            cached = self._decks.get(key)
+            if cached and cached[1] > time.monotonic(): return cached[0]
+            pk = self.model.id
+            ids = array('q', (i for (i,) in db.session.query(pk).filter(*self.criteria).order_by(pk).yield_per(50_000)))
+            if not ids or ids[-1] < 2 ** 31: ids = array('i', ids)
+            self._decks[key] = (ids, time.monotonic() + self.ttl)
+            return ids
+
+    def _walk(self, lo, hi):
+        return {'lo': lo, 'hi': hi, 'key': self.rng.getrandbits(32), 'pos': 0}
+
+    def deal(self, state, n, exclude=()):
+        """Return (ids, new_state): the player's next `n` ids, never one twice or one in
+        `exclude` (fewer once the deck has nothing else left)."""
+        ids = self.deck()
+        if not ids: return [], state
+        top = ids[-1] + 1
+        # A walk that starts past the top is from before a reseed or the newest rows' deletion.
+        if not (isinstance(state, dict) and state.keys() == {'lo', 'hi', 'key', 'pos'}
+                and 0 <= state['lo'] < min(state['hi'], top) and 0 <= state['pos'] <= state['hi'] - state['lo']):
+            state = self._walk(ids[0], top)
+        state = dict(state)
+        seen = set(exclude)
+        left = len(ids) - sum(1 for i in seen if self._has(ids, i))
+        dealt = []
+        while len(dealt) < n and left > 0:
+            lo, hi, pos = state['lo'], state['hi'], state['pos']
+            if pos >= hi - lo:
+                # Range done: deal what was added since, and reshuffle only once there's nothing new.
+                state = self._walk(hi, top) if top > hi else self._walk(ids[0], top)
+                continue
+            candidate = lo + permute(pos, hi - lo, state['key'])
+            state['pos'] = pos + 1
+            if candidate in seen: continue
+            # Past this deck's top means added since it was built (another worker
+            # started the range): deal it and let the caller check the row.
+            if self._has(ids, candidate):
+                left -= 1
+            elif candidate < top:
+                continue
+            seen.add(candidate)
+            dealt.append(candidate)
+        return dealt, state
+
+    @staticmethod
+    def _has(ids, i):
+        found = bisect.bisect_left(ids, i)
+        return found < len(ids) and ids[found] == i
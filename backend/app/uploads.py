@@ -0,0 +1,122 @@
+import calendar
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+EVENT_REQUIRED = ('title', 'description', 'year', 'month', 'day')
+
+class MalformedUpload(ValueError):
+    """The upload can't be parsed past this point; rows before it were already yielded."""
+
+class InvalidRow:
+    def __init__(self, error):
+        self.error = error
+
+def _text_chunks(stream, chunk_size):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        while data := stream.read(chunk_size):
+            if text := decoder.decode(data): yield text
+        if text := decoder.decode(b'', final=True): yield text
+    except UnicodeDecodeError as e:
+        raise MalformedUpload(f'Upload is not valid UTF-8: {e}')
+
+def iter_json_rows(stream, chunk_size=64 * 1024, max_row_chars=64 * 1024):
+    """Yield (index, value) for each row of a JSON array or NDJSON body, reading `stream` in chunks.
+
+    At most one row (up to `max_row_chars`) plus one chunk is held at a time.
+    An NDJSON line that isn't valid JSON yields an InvalidRow and parsing
+    carries on; an array can't be resynchronised, so it raises MalformedUpload.
+    """
+    chunks = _text_chunks(stream, chunk_size)
+    text = ''
+    for chunk in chunks:
+        text = (text + chunk).lstrip(_WHITESPACE)
+        if text: break
+    if text.startswith('['): return _array_rows(text[1:], chunks, max_row_chars)
+    return _ndjson_rows(text, chunks, max_row_chars)
+
+def _ndjson_rows(text, chunks, limit):
+    index = 0
+    for line in _lines(text, chunks, limit):
+        if not line.strip(_WHITESPACE): continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as e:
+            yield index, InvalidRow(f'Invalid JSON: {e}')
+        index += 1
+
+def _lines(text, chunks, limit):
+    while True:
+        *lines, text = text.split('\n')
+        yield from lines
+        if len(text) > limit: raise MalformedUpload(f'Line longer than {limit} characters')
+        chunk = next(chunks, None)
+        if chunk is None: break
+        text += chunk
+    if text: yield text
+
+def _array_rows(text, chunks, limit):
+    exhausted = False
+
+    def more():
+        nonlocal text, exhausted
+        chunk = next(chunks, None)
+        if chunk is None: exhausted = True
+        else: text += chunk
+        return not exhausted
+
+    index = 0
+    text = text.lstrip(_WHITESPACE)
+    while not text and more(): text = text.lstrip(_WHITESPACE)
+    if text.startswith(']'):
+        rest = text[1:]
+    else:
+        while True:
+            # `text` starts at a value; it only counts once the separator after it has arrived.
+            text = text.lstrip(_WHITESPACE)
+            try:
+                value, end = _decoder.raw_decode(text)
+            except ValueError as e:
+                if len(text) > limit: raise MalformedUpload(f'Row {index} is longer than {limit} characters')
+                if more(): continue
+                raise MalformedUpload(f'Row {index}: invalid JSON: {e}')
+            rest = text[end:].lstrip(_WHITESPACE)
+            if not rest:
+                if len(text) > limit: raise MalformedUpload(f'Row {index} is longer than {limit} characters')
+                if more(): continue
+                raise MalformedUpload('Unterminated JSON array')
+            if rest[0] not in ',]': raise MalformedUpload(f'Expected "," or "]" after row {index}')
+            yield index, value
+            index += 1
+            text = rest[1:]
+            if rest[0] == ']': break
+            if not text: more()
+        rest = text
+    if rest.strip(_WHITESPACE) or any(chunk.strip(_WHITESPACE) for chunk in chunks):
+        raise MalformedUpload('Unexpected data after the JSON array')
+
+def event_row(data, user_id, category_ids):
+    """Validate one uploaded event; return (row for BulkEventWriter, {category_id: relationship_description})."""
+    if not isinstance(data, dict): raise ValueError('Row must be a JSON object')
+    missing = [k for k in EVENT_REQUIRED if data.get(k) in (None, '')]
+    if missing: raise ValueError(f"Missing {', '.join(missing)}")
+    year, month, day = data['year'], data['month'], data['day']
+    if not all(type(v) is int for v in (year, month, day)): raise ValueError('year, month and day must be integers')
+    if not 1 <= month <= 12 or not 1 <= day <= calendar.monthrange(2000, month)[1]: raise ValueError('Invalid month/day')
+    for key, size in (('title', 200), ('description', None), ('source_link', 500), ('image_url', 500)):
+        value = data.get(key)
+        if value is not None and (not isinstance(value, str) or size and len(value) > size):
+            raise ValueError(f'{key} must be a string' + (f' of at most {size} characters' if size else ''))
+    links = {}
+    for link in data.get('categories') or []:
+        category_id = link.get('category_id') if isinstance(link, dict) else None
+        description = link.get('relationship_description') if isinstance(link, dict) else None
+        if type(category_id) is not int or category_id not in category_ids: raise ValueError(f'Unknown category {category_id}')
+        if not isinstance(description, str) or not description or len(description) > 255:
+            raise ValueError('relationship_description must be a non-empty string of at most 255 characters')
+        links[category_id] = description
+    row = {'title': data['title'], 'description': data['description'], 'year': year, 'month': month, 'day': day,
+           'source_link': data.get('source_link'), 'image_url': data.get('image_url'), 'user_id': user_id}
+    return row, links
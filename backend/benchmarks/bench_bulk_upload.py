@@ -0,0 +1,88 @@
+"""Rows per second and peak memory for POST /api/events/bulk against one POST /api/events per row.
+
+    python -m benchmarks.bench_bulk_upload --rows 10000 --memory-rows 10000,100000
+
+"single" posts --single-rows events one at a time. "array" and "ndjson"
+upload --rows events in one request each, read from a file on disk the way
+a real upload streams in (input_stream, not data=, which the test
+client would read whole). The memory table uploads --memory-rows NDJSON rows
+under tracemalloc; the peak should stay flat as the row count grows.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from .common import insert_synthetic, make_app
+
+def event(run, i, categories):
+    return {'title': f'Upload {run}-{i}', 'description': 'A bulk uploaded event', 'year': 1950 + i % 75, 'month': 1 + i % 12,
+            'day': 1 + i % 28, 'categories': [{'category_id': 1 + i % categories, 'relationship_description': 'Bench'}]}
+
+def write_upload(path, run, rows, categories, ndjson):
+    with open(path, 'w') as f:
+        if not ndjson: f.write('[')
+        for i in range(rows):
+            if i and not ndjson: f.write(',')
+            f.write(json.dumps(event(run, i, categories)))
+            if ndjson: f.write('\n')
+        if not ndjson: f.write(']')
+
+def signed_in(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
+
+def upload(app, path, ndjson):
+    # Only the first chunk (the counts) is kept, so the per-row results don't
+    # show up in the memory numbers.
+    with open(path, 'rb') as f:
+        response = signed_in(app).post('/api/events/bulk', input_stream=f, content_type='application/x-ndjson' if ndjson else 'application/json')
+        chunks = response.iter_encoded()
+        head = next(chunks)
+        for _ in chunks: pass
+        response.close()
+    assert response.status_code == 200, head[:200]
+    return json.loads(head + b']}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--single-rows', type=int, default=1000)
+    parser.add_argument('--memory-rows', default='10000,100000', help='Comma-separated upload sizes for the memory table.')
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file.')
+    args = parser.parse_args()
+    app = make_app(args.database_url, CACHE_BACKEND='none')
+    with app.app_context():
+        insert_synthetic(0, args.categories)
+    directory = tempfile.mkdtemp(prefix='ttc-bench-')
+
+    client = signed_in(app)
+    start = time.perf_counter()
+    for i in range(args.single_rows):
+        assert client.post('/api/events', json=event('single', i, args.categories)).status_code == 201
+    print(f'{"single":<8} {args.single_rows / (time.perf_counter() - start):10.0f} rows/s')
+
+    for name, ndjson in (('array', False), ('ndjson', True)):
+        path = os.path.join(directory, name)
+        write_upload(path, name, args.rows, args.categories, ndjson)
+        start = time.perf_counter()
+        result = upload(app, path, ndjson)
+        print(f'{name:<8} {args.rows / (time.perf_counter() - start):10.0f} rows/s  ({result["created"]} created)')
+
+    print(f'\n{"rows":>8} {"peak MiB":>9}')
+    for rows in map(int, args.memory_rows.split(',')):
+        path = os.path.join(directory, f'memory-{rows}')
+        write_upload(path, f'memory-{rows}', rows, args.categories, True)
+        tracemalloc.start()
+        result = upload(app, path, True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert result['created'] == rows
+        print(f'{rows:8d} {peak / 2 ** 20:9.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""SQL versus the columnar snapshot for GET /api/events filters, at several table sizes.
+
+    python -m benchmarks.bench_columnar --sizes 100000,1000000,5000000
+
+Needs numpy. Both apps share one database and run without the response
+cache, so every request is answered from scratch.
+"""
+import argparse
+import resource
+import time
+from app import create_app
+from app.routes import event_index
+from config import Config
+from .common import insert_synthetic, make_app, timed
+
+QUERIES = (
+    '/api/events?year=2000',
+    '/api/events?category_id=3',
+    '/api/events?month=7&day=20',
+    '/api/events?years=1969,1984,2007&category_id=5',
+    '/api/events?sort=newest&category_id=7',
+    '/api/events?sort=newest&limit=1000',
+)
+
+def app_for(url, columnar):
+    settings = {'SQLALCHEMY_DATABASE_URI': url, 'TESTING': True, 'CACHE_BACKEND': 'none', 'EVENTS_COLUMNAR_INDEX': columnar}
+    return create_app(type('BenchConfig', (Config,), settings))
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+def run(n_events, database_url):
+    setup = make_app(database_url)
+    with setup.app_context():
+        insert_synthetic(n_events, n_categories=40, links_per_event=2)
+    url = setup.config['SQLALCHEMY_DATABASE_URI']
+    sql, columnar = app_for(url, False), app_for(url, True)
+    with columnar.app_context():
+        before, start = rss_mb(), time.perf_counter()
+        snapshot = event_index.wait()
+        build = time.perf_counter() - start
+        print(f'\n{n_events:,} events: snapshot {snapshot.nbytes / 1e6:.1f} MB of arrays, '
+              f'built in {build:.2f} s, RSS +{rss_mb() - before:.0f} MB')
+    print(f'{"query":<50} {"sql ms":>9} {"columnar ms":>12} {"speedup":>8}')
+    for url in QUERIES:
+        times = []
+        for app in (sql, columnar):
+            client = app.test_client()
+            def request():
+                response = client.get(url)
+                assert response.status_code == 200
+                response.get_data()
+            times.append(timed(request, repeat=7))
+        print(f'{url:<50} {times[0]:9.2f} {times[1]:12.2f} {times[0] / times[1]:7.1f}x')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000,5000000', help='Comma-separated event counts.')
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file per size.')
+    args = parser.parse_args()
+    for n in (int(s) for s in args.sizes.split(',')):
+        run(n, args.database_url)
+
+if __name__ == '__main__':
+    main()
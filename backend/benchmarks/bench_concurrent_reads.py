@@ -0,0 +1,105 @@
+"""Read latency while a bulk import writes, per database profile (config.py).
+
+    python -m benchmarks.bench_concurrent_reads --events 20000 --import-rows 200000
+    python -m benchmarks.bench_concurrent_reads --profiles postgres --database-url postgresql://localhost/ttc_bench \\
+        --replica-url postgresql://replica/ttc_bench
+
+Each profile gets a fresh database with --events synthetic rows. Reader
+threads then hit event list and detail routes through the Flask test client,
+first with nothing else running ("idle") and then while a separate process
+streams --import-rows through BulkEventWriter ("import"). On SQLite the
+'default' profile keeps the rollback journal, so readers wait on (and time
+out behind) each batch commit; 'sqlite' uses WAL. With --replica-url the reads
+go to the replica bind.
+"""
+import argparse
+import multiprocessing
+import statistics
+import threading
+import time
+from config import PROFILES
+from app.bulk import BulkEventWriter
+from .common import insert_synthetic, make_app
+
+def bench_settings(args):
+    settings = {'CACHE_BACKEND': 'none'}
+    if args.replica_url: settings['SQLALCHEMY_BINDS'] = {'replica': args.replica_url}
+    return settings
+
+def run_import(profile, database_url, settings, rows, batch_size, started):
+    from app import create_app
+    app = create_app(type('BenchConfig', (PROFILES[profile],), {'SQLALCHEMY_DATABASE_URI': database_url, **settings}))
+    with app.app_context(), BulkEventWriter(batch_size=batch_size) as writer:
+        started.set()
+        for i in range(rows):
+            writer.add({'title': f'Imported {i}', 'description': 'Bulk import', 'year': 1950 + i % 75, 'month': 1 + i % 12,
+                        'day': 1 + i % 28, 'source_link': None, 'user_id': 1})
+
+def read(app, args, stop):
+    latencies, errors = [], [0]
+
+    def worker(n):
+        client = app.test_client()
+        i = n
+        while not stop.is_set():
+            url = f'/api/events?year={1950 + i % 75}&limit=50' if i % 2 else f'/api/events/{1 + i % args.events}'
+            start = time.perf_counter()
+            try:
+                ok = client.get(url).status_code < 400
+            except Exception:  # TESTING propagates "database is locked" and friends
+                ok = False
+            if ok: latencies.append((time.perf_counter() - start) * 1000)
+            else: errors[0] += 1
+            i += args.readers
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.readers)]
+    for t in threads: t.start()
+    return threads, latencies, errors
+
+def summary(latencies, errors, seconds):
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float('nan')] * 99
+    return f'{len(latencies) / seconds:9.1f} {cuts[49]:8.2f} {cuts[98]:9.2f} {errors[0]:7d}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default='default,sqlite', help='Comma-separated names from config.PROFILES.')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--import-rows', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--idle-seconds', type=float, default=3)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file per profile.')
+    parser.add_argument('--replica-url')
+    args = parser.parse_args()
+    settings = bench_settings(args)
+
+    print(f'{"profile":<10} {"phase":<7} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>9} {"errors":>7} {"import s":>9}')
+    for profile in args.profiles.split(','):
+        app = make_app(args.database_url, PROFILES[profile], **settings)
+        with app.app_context():
+            insert_synthetic(args.events)
+        database_url = app.config['SQLALCHEMY_DATABASE_URI']
+
+        stop = threading.Event()
+        threads, latencies, errors = read(app, args, stop)
+        time.sleep(args.idle_seconds)
+        stop.set()
+        for t in threads: t.join()
+        print(f'{profile:<10} {"idle":<7} {summary(latencies, errors, args.idle_seconds)}')
+
+        context = multiprocessing.get_context('spawn')
+        started = context.Event()
+        importer = context.Process(target=run_import, args=(profile, database_url, settings, args.import_rows, args.batch_size, started))
+        importer.start()
+        started.wait()
+        stop = threading.Event()
+        threads, latencies, errors = read(app, args, stop)
+        start = time.perf_counter()
+        importer.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for t in threads: t.join()
+        print(f'{profile:<10} {"import":<7} {summary(latencies, errors, elapsed)} {elapsed:9.2f}')
+
+if __name__ == '__main__':
+    main()
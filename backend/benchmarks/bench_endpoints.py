@@ -0,0 +1,164 @@
+"""Throughput, p50/p99 latency and SQL statements for every endpoint, against a stored baseline.
+
+    python -m benchmarks.bench_endpoints                  # compare with benchmarks/baselines/endpoints.json
+    python -m benchmarks.bench_endpoints --save           # record a new baseline
+    python -m benchmarks.bench_endpoints --database-url postgresql://localhost/ttc_bench
+
+A synthetic dataset (app/synthetic.py) is loaded, then each case is driven
+through the Flask test client from --concurrency threads signed in as
+synthetic user 1. The response cache is off unless --cache memory is given.
+The SQL count comes from one sequential request before the timed ones
+(after a warm-up request for reads).
+
+A case regresses when its p50 grows by more than --tolerance over the
+baseline, or when it issues more statements; the exit status is then 1.
+Baselines only compare against runs with the same parameters.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from app.instrumentation import count_queries
+from app.synthetic import SYNTHETIC_PASSWORD
+from .common import insert_synthetic, make_app
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'endpoints.json')
+
+def cases(args, state):
+    """(name, method, build(i) -> (url, json), signed_in) for every route in the blueprint."""
+    run = uuid.uuid4().hex[:8]
+    year = lambda i: 1950 + i % 75
+    month_day = lambda i: (1 + i % 12, 1 + i % 28)
+    new_event = lambda i: {'title': f'Bench event {run}-{i}', 'description': 'A computer network launch', 'year': year(i),
+                           'month': month_day(i)[0], 'day': month_day(i)[1], 'categories': [{'category_id': 1 + i % args.categories, 'relationship_description': 'Bench'}]}
+    return (
+        ('index', 'GET', lambda i: ('/api/', None), True),
+        ('signup', 'POST', lambda i: ('/api/signup', {'username': f'bench-{run}-{i}', 'password': 'bench password'}), False),
+        ('login', 'POST', lambda i: ('/api/login', {'username': 'synthetic1', 'password': SYNTHETIC_PASSWORD}), False),
+        ('check_session', 'GET', lambda i: ('/api/check_session', None), True),
+        ('events_featured', 'GET', lambda i: ('/api/events/featured', None), True),
+        ('events_by_year', 'GET', lambda i: (f'/api/events?year={year(i)}', None), True),
+        ('events_by_category', 'GET', lambda i: (f'/api/events?category_id={1 + i % args.categories}', None), True),
+        ('events_on_this_day', 'GET', lambda i: ('/api/events?month={}&day={}'.format(*month_day(i)), None), True),
+        ('events_newest', 'GET', lambda i: ('/api/events?sort=newest&limit=100', None), True),
+        ('events_ndjson', 'GET', lambda i: (f'/api/events?format=ndjson&year={year(i)}', None), True),
+        ('events_search', 'GET', lambda i: (f'/api/events/search?q={("robot", "space chip", "netw")[i % 3]}', None), True),
+        ('event_detail', 'GET', lambda i: (f'/api/events/{1 + i % args.events}', None), True),
+        ('categories', 'GET', lambda i: ('/api/categories', None), True),
+        ('trivia', 'GET', lambda i: ('/api/trivia', None), True),
+        ('stats_timeline', 'GET', lambda i: ('/api/stats/timeline?month={}&day={}'.format(*month_day(i)), None), True),
+        ('create_event', 'POST', lambda i: ('/api/events', new_event(i)), True),
+        ('events_bulk', 'POST', lambda i: ('/api/events/bulk', [new_event(10 ** 6 + 50 * i + j) for j in range(50)]), True),
+        ('update_event', 'PATCH', lambda i: (f'/api/events/{state["events"][i]}', {'description': f'Edited {i}'}), True),
+        ('delete_event', 'DELETE', lambda i: (f'/api/events/{state["events"][i]}', None), True),
+        ('create_category', 'POST', lambda i: ('/api/categories', {'name': f'Bench {run}-{i}', 'description': 'Bench'}), True),
+        ('delete_category', 'DELETE', lambda i: (f'/api/categories/{state["categories"][i]}', None), True),
+        ('logout', 'DELETE', lambda i: ('/api/logout', None), True),
+    )
+
+def client_for(app, signed_in):
+    client = app.test_client()
+    if signed_in:
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+    return client
+
+def send(client, method, build, i, state):
+    url, body = build(i)
+    response = client.open(url, method=method, json=body)
+    data = response.get_data()
+    if response.status_code == 201 and method == 'POST':
+        created = json.loads(data)
+        if url == '/api/events': state['events'].append(created['id'])
+        if url == '/api/categories': state['categories'].append(created['id'])
+    return response.status_code
+
+def run_case(app, case, args, state):
+    name, method, build, signed_in = case
+    # Reads get one uncounted request first so per-worker caches (the
+    # sampler's id range, ...) are warm whatever ran before.
+    if method == 'GET': send(client_for(app, signed_in), method, build, 0, state)
+    with app.app_context(), count_queries() as counter:
+        status = send(client_for(app, signed_in), method, build, 0, state)
+    indices, latencies, statuses = itertools.count(1), [], Counter([status])
+
+    def worker():
+        client = client_for(app, signed_in)
+        while (i := next(indices)) < args.requests:
+            if not signed_in: client = client_for(app, False)
+            start = time.perf_counter()
+            statuses[send(client, method, build, i, state)] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    errors = sum(n for code, n in statuses.items() if code >= 400)
+    return {'method': method, 'rps': round(len(latencies) / elapsed, 1), 'p50_ms': round(cuts[49], 2),
+            'p99_ms': round(cuts[98], 2), 'sql': counter.count, 'errors': errors}
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before: continue
+        if result['p50_ms'] > before['p50_ms'] * (1 + tolerance): regressions.append(f"{name}: p50 {before['p50_ms']} -> {result['p50_ms']} ms")
+        if result['sql'] > before['sql']: regressions.append(f"{name}: {before['sql']} -> {result['sql']} SQL statements")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--links-per-event', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help='Requests per case.')
+    parser.add_argument('--only', help='Comma-separated case names to run (write cases need create_* first).')
+    parser.add_argument('--cache', choices=('none', 'memory'), default='none', help='Response cache backend.')
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative p50 growth.')
+    args = parser.parse_args()
+    params = {k: getattr(args, k) for k in ('users', 'categories', 'events', 'links_per_event', 'concurrency', 'requests', 'cache')}
+    params['database'] = (args.database_url or 'sqlite').split(':')[0]
+
+    app = make_app(args.database_url, CACHE_BACKEND=args.cache, BCRYPT_LOG_ROUNDS=4)
+    with app.app_context():
+        insert_synthetic(args.events, args.categories, args.links_per_event, n_users=args.users)
+    state = {'events': [], 'categories': []}
+    results = {}
+    print(f'{"case":<20} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"sql":>5} {"errors":>7}')
+    only = set(args.only.split(',')) if args.only else None
+    for case in cases(args, state):
+        if only and case[0] not in only: continue
+        result = results[case[0]] = run_case(app, case, args, state)
+        print(f'{case[0]:<20} {result["rps"]:8.1f} {result["p50_ms"]:8.2f} {result["p99_ms"]:8.2f} {result["sql"]:5d} {result["errors"]:7d}')
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return print(f'Baseline written to {args.baseline}')
+    if not os.path.exists(args.baseline): return print('No baseline to compare with; run with --save to record one.')
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['params'] != params: return print(f'Baseline was recorded with {baseline["params"]}; not comparing.')
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for line in regressions: print('REGRESSION', line)
+    if not regressions: print('No regressions against the baseline.')
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
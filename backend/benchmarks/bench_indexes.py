@@ -0,0 +1,60 @@
+"""Query plans and latencies for the /api/events filter paths, with and without
+the secondary indexes from migration 7c2d9e41a3b5.
+
+    python -m benchmarks.bench_indexes --events 1000000
+"""
+import argparse
+from sqlalchemy import text
+from app import db
+from app.models import Event, EventCategory
+from .common import insert_synthetic, make_app, timed
+
+QUERIES = {
+    'years IN, historical sort': (
+        "SELECT id FROM events WHERE year IN (1999, 2007) ORDER BY year, month, day, id LIMIT 200"),
+    'year + month + day': (
+        "SELECT id FROM events WHERE year = 2007 AND month = 1 AND day = 9 ORDER BY year, month, day, id LIMIT 200"),
+    'this day in history': (
+        "SELECT id FROM events WHERE month = 1 AND day = 9 ORDER BY year, month, day, id LIMIT 200"),
+    'category join': (
+        "SELECT events.id FROM events JOIN event_categories ON events.id = event_categories.event_id "
+        "WHERE event_categories.category_id = 3 ORDER BY events.year, events.month, events.day, events.id LIMIT 200"),
+    'newest': (
+        "SELECT id FROM events ORDER BY created_at DESC, id DESC LIMIT 200"),
+    'importer dedupe': (
+        "SELECT id FROM events WHERE year = 2007 AND month = 1 AND day = 9 AND title = 'Event 42' LIMIT 1"),
+}
+
+def explain(sql):
+    if db.engine.dialect.name == 'sqlite':
+        return '; '.join(row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+    return '; '.join(row[0].strip() for row in db.session.execute(text('EXPLAIN ' + sql)))
+
+def report(label):
+    print(f'\n== {label} ==')
+    for name, sql in QUERIES.items():
+        ms = timed(lambda: db.session.execute(text(sql)).all())
+        print(f'{name:<28} {ms:9.2f} ms   {explain(sql)}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file.')
+    args = parser.parse_args()
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        print(f'Inserting {args.events} synthetic events...')
+        insert_synthetic(args.events)
+        indexes = list(Event.__table__.indexes) + list(EventCategory.__table__.indexes)
+        with db.engine.begin() as conn:
+            for index in indexes: index.drop(conn)
+        db.session.execute(text('ANALYZE'))
+        report('without secondary indexes')
+        with db.engine.begin() as conn:
+            for index in indexes: index.create(conn)
+        db.session.execute(text('ANALYZE'))
+        report('with secondary indexes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Backfill wall time against the local feed stub: the old sequential importer
+loop versus FeedFetcher.
+
+    python -m benchmarks.bench_ingest --years 2000 2024 --latency 0.05
+"""
+import argparse
+import time
+import requests # type: ignore
+from app import db
+from app.ingest import FeedFetcher, ingest_units, units_in_years
+from app.models import Event, User
+from .common import make_app
+from .feed_stub import FeedStub
+
+def sequential(url, first_year, last_year):
+    # What populate.sh did: one process per year, a fresh connection per day.
+    for _, month, day in units_in_years(first_year, last_year):
+        requests.get(f'{url}/{month}/{day}').json()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, nargs=2, default=(2020, 2024))
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=100.0)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    first, last = args.years
+
+    with FeedStub(latency=args.latency) as stub:
+        start = time.perf_counter()
+        sequential(stub.url, first, last)
+        print(f'sequential fetch only, {last - first + 1} years: {time.perf_counter() - start:7.1f} s, {stub.requests} requests')
+
+    app = make_app()
+    with FeedStub(latency=args.latency, failure_rate=args.failure_rate) as stub, app.app_context():
+        archivist = User(username='Archivist', _password_hash='x')
+        db.session.add(archivist)
+        db.session.commit()
+        fetcher = FeedFetcher(stub.url, rate=args.rate, workers=args.workers, backoff=0.05)
+        start = time.perf_counter()
+        failed = ingest_units(fetcher, units_in_years(first, last), archivist)
+        elapsed = time.perf_counter() - start
+        print(f'FeedFetcher fetch + save, {last - first + 1} years: {elapsed:7.1f} s, {stub.requests} requests '
+              f'({args.failure_rate:.0%} injected 503s), {len(failed)} failed days, {Event.query.count()} events')
+
+if __name__ == '__main__':
+    main()
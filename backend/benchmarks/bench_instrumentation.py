@@ -0,0 +1,40 @@
+"""What request metrics cost: requests per second with METRICS_ENABLED off and on.
+
+    python -m benchmarks.bench_instrumentation --seconds 5
+"""
+import argparse
+import tempfile
+import time
+from .common import insert_synthetic, make_app
+
+URLS = ('/api/', '/api/events?year=2000&limit=20', '/api/events/7')
+
+def rps(app, url, seconds):
+    client = app.test_client()
+    client.get(url)
+    done, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client.get(url).get_data()
+        done += 1
+    return done / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    setups = {
+        'off': {},
+        'on': {'METRICS_ENABLED': True},
+        'on + METRICS_DIR': {'METRICS_ENABLED': True, 'METRICS_DIR': tempfile.mkdtemp(prefix='ttc-metrics-')},
+    }
+    apps = {}
+    for name, settings in setups.items():
+        apps[name] = make_app(CACHE_BACKEND='none', **settings)
+        with apps[name].app_context():
+            insert_synthetic(2000)
+    print(f'{"url":<36}' + ''.join(f'{name:>20}' for name in setups))
+    for url in URLS:
+        print(f'{url:<36}' + ''.join(f'{rps(app, url, args.seconds):15.1f} rq/s' for app in apps.values()))
+
+if __name__ == '__main__':
+    main()
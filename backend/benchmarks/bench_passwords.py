@@ -0,0 +1,78 @@
+"""Read latency while logins hammer bcrypt: inline hashing versus the bounded pool.
+
+    python -m benchmarks.bench_passwords --logins 8 --readers 4 --seconds 10
+
+The app is served by a threaded werkzeug server, standing in for one gthread
+gunicorn worker. Login clients loop on POST /api/login while read clients loop
+on cheap GETs; the read p50/p99 is what the pool is meant to protect.
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+from collections import Counter
+import requests # type: ignore
+from werkzeug.serving import make_server
+from app import db
+from app.models import User
+from .common import insert_synthetic, make_app
+
+READ_URL = '/api/events?year=2000&limit=20'
+
+def run_case(workers, args):
+    app = make_app(BCRYPT_LOG_ROUNDS=args.rounds, PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE=args.queue)
+    with app.app_context():
+        insert_synthetic(2000)
+        for i in range(args.logins):
+            user = User(username=f'user{i}')
+            user.password_hash = 'correct horse'
+            db.session.add(user)
+        db.session.commit()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    stop = threading.Event()
+    reads, logins = [], Counter()
+
+    def reader():
+        http = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            http.get(base + READ_URL).raise_for_status()
+            reads.append((time.perf_counter() - start) * 1000)
+
+    def login(i):
+        http = requests.Session()
+        while not stop.is_set():
+            response = http.post(base + '/api/login', json={'username': f'user{i}', 'password': 'correct horse'})
+            logins[response.status_code] += 1
+            if response.status_code == 503: time.sleep(0.05)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=login, args=(i,)) for i in range(args.logins)]
+    for t in threads: t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads: t.join()
+    server.shutdown()
+    cuts = statistics.quantiles(reads, n=100)
+    label = 'inline' if workers == 0 else f'pool({workers}+{args.queue})'
+    print(f'{label:<14} reads {len(reads) / args.seconds:8.1f}/s  p50 {cuts[49]:7.1f} ms  p99 {cuts[98]:7.1f} ms  '
+          f'logins ok {logins[200] / args.seconds:6.1f}/s  503s {logins[503]}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=8, help='Concurrent login clients.')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent read clients.')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_LOG_ROUNDS.')
+    parser.add_argument('--workers', type=int, default=1, help='PASSWORD_HASH_WORKERS for the pooled case.')
+    parser.add_argument('--queue', type=int, default=4, help='PASSWORD_HASH_QUEUE for the pooled case.')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    for workers in (0, args.workers):
+        run_case(workers, args)
+
+if __name__ == '__main__':
+    main()
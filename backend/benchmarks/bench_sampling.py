@@ -0,0 +1,53 @@
+"""ORDER BY random() versus IdRangeSampler for /api/events/featured and /api/trivia.
+
+    python -m benchmarks.bench_sampling --events 500000
+"""
+import argparse
+from collections import Counter
+from sqlalchemy import delete
+from sqlalchemy.sql.expression import func
+from app import db
+from app.models import Event, EventCategory
+from app.routes import TRIVIA_CRITERIA
+from app.sampling import IdRangeSampler
+from .common import insert_synthetic, make_app, timed
+
+def uniformity(app, draws=60000):
+    """Chi-square of single draws over a small table with holes punched in the id range."""
+    with app.app_context():
+        db.session.execute(delete(EventCategory).where(EventCategory.event_id > 400))
+        db.session.execute(delete(Event).where(Event.id > 400))
+        db.session.execute(delete(EventCategory).where(EventCategory.event_id % 3 == 0))
+        db.session.execute(delete(Event).where(Event.id % 3 == 0))
+        db.session.commit()
+        sampler = IdRangeSampler(Event)
+        sampler.sample(1)  # warm the cached range
+        counts = Counter(row.id for _ in range(draws) for row in sampler.sample(1))
+        rows = Event.query.count()
+        expected = draws / rows
+        chi2 = sum((counts.get(i, 0) - expected) ** 2 / expected for (i,) in db.session.query(Event.id))
+        print(f'uniformity: {rows} rows, {draws} draws, chi-square {chi2:.1f} on {rows - 1} degrees of freedom')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=500_000)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file.')
+    args = parser.parse_args()
+
+    app = make_app(args.database_url)
+    with app.app_context():
+        print(f'Inserting {args.events} synthetic events...')
+        insert_synthetic(args.events)
+        sampler = IdRangeSampler(Event)
+        cases = {
+            'featured: ORDER BY random() LIMIT 20': lambda: Event.query.order_by(func.random()).limit(20).all(),
+            'featured: IdRangeSampler(20)': lambda: sampler.sample(20),
+            'trivia:   ORDER BY random() LIMIT 1': lambda: Event.query.filter(*TRIVIA_CRITERIA).order_by(func.random()).first(),
+            'trivia:   IdRangeSampler(1)': lambda: sampler.sample(1, TRIVIA_CRITERIA),
+        }
+        for name, fn in cases.items():
+            print(f'{name:<40} {timed(fn, repeat=9):9.2f} ms')
+    uniformity(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Golden check and microbenchmark: compiled serializers versus SerializerMixin.to_dict.
+
+    python -m benchmarks.bench_serializers --events 10000
+
+Exits non-zero if any compiled serializer disagrees with to_dict on the sample.
+"""
+import argparse
+import sys
+from app import db
+from app.models import User, Event, Category
+from app.serializers import category_full, event_detail, event_summary, user_full
+from .common import insert_synthetic, make_app, timed
+
+# (label, model, to_dict rules used in routes.py, compiled serializer)
+CASES = (
+    ('event list', Event, ('-event_categories',), event_summary),
+    ('event detail', Event, ('-user.events', '-user.categories', '-event_categories.event'), event_detail),
+    ('event full', Event, (), event_detail),
+    ('category', Category, (), category_full),
+)
+
+def golden_check():
+    failures = 0
+    for label, model, rules, compiled in CASES:
+        for obj in model.query.limit(300):
+            if obj.to_dict(rules=rules) != compiled(obj):
+                print(f'MISMATCH {label} id={obj.id}')
+                failures += 1
+    user = User.query.first()
+    db.session.add(Event(title='No timestamp', description='x', year=2000, month=1, day=1, user_id=user.id, created_at=None))
+    db.session.flush()
+    if user.to_dict() != user_full(user):
+        print('MISMATCH user')
+        failures += 1
+    db.session.rollback()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=10_000)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        insert_synthetic(args.events, links_per_event=2)
+        failures = golden_check()
+        print('golden check:', 'FAILED' if failures else 'ok')
+        events = Event.query.all()
+        for event in events: event.user
+        print(f'{len(events)} events, {"to_dict":>12} {"compiled":>12}')
+        for label, _, rules, compiled in CASES[:2]:
+            before = timed(lambda: [e.to_dict(rules=rules) for e in events], repeat=3)
+            after = timed(lambda: [compiled(e) for e in events], repeat=3)
+            print(f'{label:<14} {before:9.1f} ms {after:9.1f} ms   x{before / after:.1f}')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Requests per second for GET /api/check_session, before and after the profile cache.
+
+    python -m benchmarks.bench_session --events 2000 --seconds 5
+
+"before" is the previous handler (full user graph, straight from the
+database), registered on the bench app under another path; "uncached" is the
+current handler with CACHE_BACKEND='none'; "cached" is the default setup.
+"""
+import argparse
+import time
+from flask import jsonify, make_response, session
+from app import db
+from app.models import User
+from app.serializers import user_full
+from .common import insert_synthetic, make_app
+
+def previous_check_session():
+    user_id = session.get('user_id')
+    if user_id:
+        user = db.session.get(User, user_id, options=user_full.options)
+        if user: return make_response(jsonify(user_full(user)), 200)
+    return make_response(jsonify({}), 204)
+
+def rps(app, url, seconds):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 1
+    client.get(url)
+    done, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        assert client.get(url).status_code == 200
+        done += 1
+    return done / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000, help="Events owned by the signed-in user.")
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    for label, backend in (('uncached', 'none'), ('cached', 'memory')):
+        app = make_app(CACHE_BACKEND=backend)
+        app.add_url_rule('/bench/previous_check_session', view_func=previous_check_session)
+        with app.app_context():
+            insert_synthetic(args.events)
+        if backend == 'none':
+            print(f'{"before":<10} {rps(app, "/bench/previous_check_session", args.seconds):9.1f} req/s')
+        print(f'{label:<10} {rps(app, "/api/check_session", args.seconds):9.1f} req/s')
+
+if __name__ == '__main__':
+    main()
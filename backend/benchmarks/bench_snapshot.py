@@ -0,0 +1,52 @@
+"""Export and import throughput for flask export_snapshot / import_snapshot.
+
+    python -m benchmarks.bench_snapshot --events 1000000 --links-per-event 2
+    python -m benchmarks.bench_snapshot --database-url postgresql://localhost/ttc_a --target-url postgresql://localhost/ttc_b
+
+A synthetic dataset is exported from one database and imported into a fresh
+one. "rows" is the synthetic generator inserting the same data with indexes
+in place and ORM-level core inserts, for comparison.
+"""
+import argparse
+import os
+import tempfile
+import time
+from app import db
+from app.models import Event
+from app.snapshot import export_snapshot, import_snapshot
+from .common import insert_synthetic, make_app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--links-per-event', type=int, default=2)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--database-url', help='Source; defaults to a throwaway SQLite file.')
+    parser.add_argument('--target-url', help='Import target; defaults to a throwaway SQLite file.')
+    args = parser.parse_args()
+    path = os.path.join(tempfile.mkdtemp(prefix='ttc-bench-'), 'bench.snapshot.gz')
+
+    source = make_app(args.database_url)
+    with source.app_context():
+        start = time.perf_counter()
+        insert_synthetic(args.events, args.categories, args.links_per_event, batch_size=args.chunk_size)
+        generated = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = export_snapshot(path, args.chunk_size)
+        exported = time.perf_counter() - start
+    rows = sum(counts.values())
+
+    target = make_app(args.target_url)
+    with target.app_context():
+        start = time.perf_counter()
+        import_snapshot(path, log=lambda message: None)
+        imported = time.perf_counter() - start
+        assert db.session.query(Event).count() == args.events
+
+    print(f'{rows} rows, snapshot {os.path.getsize(path) / 2 ** 20:.1f} MiB')
+    for name, seconds in (('generate', generated), ('export', exported), ('import', imported)):
+        print(f'{name:<9} {seconds:8.2f} s {rows / seconds:12.0f} rows/s')
+
+if __name__ == '__main__':
+    main()
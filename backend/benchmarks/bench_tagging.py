@@ -0,0 +1,45 @@
+"""Keyword matching throughput over synthetic feed descriptions.
+
+    python -m benchmarks.bench_tagging --descriptions 2000000
+"""
+import argparse
+import random
+import time
+from app.tagging import KEYWORD_CATEGORIES, KeywordMatcher
+from .feed_stub import SUBJECTS
+
+FILLER = ('the', 'first', 'launch', 'of', 'a', 'new', 'treaty', 'signed', 'in', 'city', 'record', 'opened', 'company', 'national', 'station')
+
+def descriptions(n, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(FILLER) for _ in range(14)) + ' ' + rng.choice(SUBJECTS) + '.' for _ in range(n)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--descriptions', type=int, default=2_000_000)
+    parser.add_argument('--batch', type=int, default=1000, help='Descriptions per match_batch call (about one feed batch).')
+    args = parser.parse_args()
+    texts = descriptions(args.descriptions)
+    keywords = list(KEYWORD_CATEGORIES)
+    matcher = KeywordMatcher()
+
+    def substring_any():
+        return [any(k in t.lower() for k in keywords) for t in texts]
+
+    def per_text():
+        return [matcher.match(t) for t in texts]
+
+    def batched():
+        out = []
+        for i in range(0, len(texts), args.batch): out.extend(matcher.match_batch(texts[i:i + args.batch]))
+        return out
+
+    for label, fn in (('any(keyword in text) [old]', substring_any), ('KeywordMatcher.match', per_text), (f'KeywordMatcher.match_batch({args.batch})', batched)):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        hits = sum(1 for r in result if r)
+        print(f'{label:<34} {len(texts) / elapsed:>12,.0f} descriptions/s  ({hits} matched)')
+
+if __name__ == '__main__':
+    main()
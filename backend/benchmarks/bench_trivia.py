@@ -0,0 +1,78 @@
+"""Thousands of concurrent trivia players: requests, latency and repeated questions.
+
+    python -m benchmarks.bench_trivia --players 2000 --questions 30 --events 20000
+
+Each player is its own test client (its own session cookie) and answers
+--questions questions. "before" is the previous handler, one random event
+per request from the id-range sampler, registered on the bench app under
+another path; "batched" asks /api/trivia?n=--batch from the shared deck.
+Players are spread over --concurrency threads. "repeats" counts questions a
+player had already been asked.
+"""
+import argparse
+import itertools
+import statistics
+import threading
+import time
+from flask import jsonify, make_response
+from app.routes import TRIVIA_CRITERIA, event_sampler
+from .common import insert_synthetic, make_app
+
+def previous_trivia():
+    events = event_sampler.sample(1, TRIVIA_CRITERIA)
+    return make_response(jsonify({'description': events[0].description, 'correct_year': events[0].year}), 200)
+
+def play(app, args, url):
+    players = itertools.count()
+    latencies, requests, repeats = [], [0], [0]
+    lock = threading.Lock()
+
+    def worker():
+        while next(players) < args.players:
+            client = app.test_client()
+            seen, asked, mine = set(), 0, []
+            while asked < args.questions:
+                start = time.perf_counter()
+                response = client.get(url)
+                mine.append((time.perf_counter() - start) * 1000)
+                questions = response.get_json()
+                if not isinstance(questions, list): questions = [questions]
+                for q in questions[:args.questions - asked]:
+                    key = (q['description'], q['correct_year'])
+                    if key in seen: repeats[0] += 1
+                    seen.add(key)
+                asked += len(questions)
+            with lock:
+                latencies.extend(mine)
+                requests[0] += len(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100)
+    questions = args.players * args.questions
+    return f'{requests[0]:9d} {questions / elapsed:12.0f} {cuts[49]:8.2f} {cuts[98]:8.2f} {repeats[0]:8d}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=30, help='Questions per player.')
+    parser.add_argument('--batch', type=int, default=10)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file.')
+    args = parser.parse_args()
+    app = make_app(args.database_url, CACHE_BACKEND='none')
+    app.add_url_rule('/bench/previous_trivia', view_func=previous_trivia)
+    with app.app_context():
+        insert_synthetic(args.events)
+    app.test_client().get('/api/trivia')  # build the deck outside the timed run
+
+    print(f'{"":<8} {"requests":>9} {"questions/s":>12} {"p50 ms":>8} {"p99 ms":>8} {"repeats":>8}')
+    print(f'{"before":<8} {play(app, args, "/bench/previous_trivia")}')
+    print(f'{"batched":<8} {play(app, args, f"/api/trivia?n={args.batch}")}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Fail if the columnar snapshot lists events differently from SQL.
+
+    python -m benchmarks.check_columnar
+
+Needs numpy. Some events get a NULL created_at first; sort=newest puts
+them last on both paths. Every query is compared as one full page, and both
+paths are also walked page by page with cursors (so some pages end on a NULL
+row), which has to visit the same ids in the same order.
+"""
+import sys
+from sqlalchemy import update
+from app import db
+from app.models import Event
+from app.routes import event_index
+from .bench_columnar import app_for
+from .common import insert_synthetic, make_app
+
+QUERIES = (
+    '/api/events?year=2000',
+    '/api/events?category_id=3',
+    '/api/events?month=7&day=20',
+    '/api/events?years=1969,1984,2007&category_id=5',
+    '/api/events?sort=newest',
+    '/api/events?sort=newest&category_id=7',
+)
+
+def ids(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [e['id'] for e in response.get_json()], response.headers.get('X-Next-Cursor')
+
+def walk(client, url, limit):
+    seen, cursor = [], None
+    while True:
+        page, cursor = ids(client, f'{url}&limit={limit}' + (f'&cursor={cursor}' if cursor else ''))
+        seen += page
+        if not cursor: return seen
+
+def main():
+    setup = make_app()
+    with setup.app_context():
+        insert_synthetic(800, n_categories=10, links_per_event=2)
+        db.session.execute(update(Event).where(Event.id % 7 == 0).values(created_at=None))
+        db.session.commit()
+    url = setup.config['SQLALCHEMY_DATABASE_URI']
+    sql, columnar = app_for(url, False).test_client(), app_for(url, True).test_client()
+    with columnar.application.app_context():
+        event_index.wait()
+    failures = 0
+    for query in QUERIES:
+        expected, _ = ids(sql, f'{query}&limit=1000')
+        one_page, _ = ids(columnar, f'{query}&limit=1000')
+        sql_paged, paged = walk(sql, query, 37), walk(columnar, query, 37)
+        flag = 'ok' if expected == one_page == sql_paged == paged else 'DIFFERS'
+        failures += flag != 'ok'
+        print(f'{flag:<8} {query:<50} {len(expected):>4} events')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Fail if any endpoint's SQL statement count grows with the number of rows.
+
+    python -m benchmarks.check_query_counts
+
+Every endpoint is hit against a small and a ten-times larger dataset; the
+statement counts have to match, and so do the parameter sets (an
+executemany DELETE over every child row is one statement but n rows). The writes run against a category linked to
+every event and an event linked to every category, so their child rows grow
+with the dataset too.
+"""
+import sys
+from sqlalchemy import insert
+from app import db
+from app.instrumentation import count_queries
+from app.models import Category, Event, EventCategory
+from app.stats import rebuild_stats
+from .common import insert_synthetic, make_app
+
+ENDPOINTS = (
+    ('GET', '/api/events?year=2000'),
+    ('GET', '/api/events?category_id=1'),
+    ('GET', '/api/events?sort=newest&limit=1000'),
+    ('GET', '/api/events?format=ndjson&category_id=2'),
+    ('GET', '/api/events/featured'),
+    ('GET', '/api/events/1'),
+    ('GET', '/api/categories'),
+    ('GET', '/api/trivia'),
+    ('GET', '/api/check_session'),
+    ('GET', '/api/stats/timeline?month=1&day=1'),
+    # PATCH drops one link, rewords one and adds one; the rest are unchanged.
+    ('PATCH', '/api/events/{wide}'),
+    ('DELETE', '/api/events/{wide}'),
+    ('DELETE', '/api/categories/{popular}'),
+)
+
+def add_wide_rows():
+    """A 'popular' category on every event and a 'wide' event in every category; returns their ids and a PATCH body."""
+    popular = Category(name='Popular', user_id=1)
+    extra = Category(name='Extra', user_id=1)
+    wide = Event(title='Wide event', description='In every category', year=2000, month=1, day=1, user_id=1)
+    db.session.add_all([popular, extra, wide])
+    db.session.flush()
+    category_ids = [c for (c,) in db.session.query(Category.id).filter(Category.id != extra.id).order_by(Category.id)]
+    event_ids = [e for (e,) in db.session.query(Event.id).filter(Event.id != wide.id)]
+    db.session.execute(insert(EventCategory), [{'event_id': e, 'category_id': popular.id, 'relationship_description': 'Popular'} for e in event_ids]
+                       + [{'event_id': wide.id, 'category_id': c, 'relationship_description': 'Wide'} for c in category_ids])
+    rebuild_stats()
+    db.session.commit()
+    patch = {'description': 'Edited', 'categories': [{'category_id': c, 'relationship_description': 'Wide'} for c in category_ids[2:]]
+             + [{'category_id': category_ids[1], 'relationship_description': 'Reworded'}, {'category_id': extra.id, 'relationship_description': 'New'}]}
+    return {'popular': popular.id, 'wide': wide.id}, patch
+
+def measure(n_events):
+    app = make_app()
+    with app.app_context():
+        insert_synthetic(n_events, n_categories=max(2, n_events // 50), links_per_event=2)
+        ids, patch = add_wide_rows()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    counts = {}
+    with app.app_context():
+        for method, url in ENDPOINTS:
+            with count_queries() as counter:
+                response = client.open(url.format(**ids), method=method, json=patch if method == 'PATCH' else None)
+                response.get_data()
+            counts[(method, url)] = (response.status_code, counter.count, counter.parameter_sets)
+            db.session.remove()
+    return counts
+
+def main():
+    small, large = measure(200), measure(2000)
+    failures = 0
+    for key in ENDPOINTS:
+        (status, before, params_before), (_, after, params_after) = small[key], large[key]
+        flag = 'ok' if after <= before and params_after <= params_before else 'GROWS'
+        failures += flag != 'ok'
+        print(f'{flag:<6} {status} {key[0]} {key[1]:<45} {before:>4} -> {after:>4} statements, {params_before:>4} -> {params_after:>4} parameter sets')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import os
+import statistics
+import tempfile
+import time
+from config import get_config
+from app import create_app, db
+from app.synthetic import generate
+
+def make_app(database_url=None, profile=None, **settings):
+    """A fresh app on an empty schema; `settings` override the `profile` config class
+    (by default the one production would pick for the URL)."""
+    if database_url is None:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='ttc-bench-'), 'bench.db')
+    profile = profile or get_config(uri=database_url)
+    BenchConfig = type('BenchConfig', (profile,), {'SQLALCHEMY_DATABASE_URI': database_url, 'TESTING': True, **settings})
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+def insert_synthetic(n_events, n_categories=20, links_per_event=1, seed=0, batch_size=50000, n_users=1):
+    """app.synthetic.generate() with the benchmarks' defaults; call inside an app context."""
+    return generate(users=n_users, categories=n_categories, events=n_events, links_per_event=links_per_event, seed=seed, batch_size=batch_size)
+
+def timed(fn, repeat=5):
+    """Run fn `repeat` times and return the median wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
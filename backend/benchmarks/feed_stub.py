@@ -0,0 +1,80 @@
+"""A local stand-in for the Wikipedia on-this-day feed.
+
+    python -m benchmarks.feed_stub --port 8765
+    ONTHISDAY_API_URL=http://127.0.0.1:8765 flask backfill run 2000 2024 --rate 200
+
+Payloads are deterministic per month/day; latency and a failure rate can be
+injected to exercise the importer's retry path.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUBJECTS = ('computer', 'internet', 'software', 'Apple', 'Microsoft', 'Google', 'NASA', 'space probe',
+            'robot', 'web browser', 'semiconductor', 'chip', 'railway', 'treaty', 'election', 'earthquake')
+
+def make_payload(month, day, events_per_day=40):
+    rng = random.Random(month * 100 + day)
+    events = []
+    for i in range(events_per_day):
+        subject = rng.choice(SUBJECTS)
+        title = f'{subject.title()} milestone {month}-{day}-{i}'
+        events.append({
+            'text': f'A notable {subject} milestone is recorded on {month}/{day}, item {i}.',
+            'year': rng.randint(1900, 2024),
+            'pages': [{'title': title, 'content_urls': {'desktop': {'page': f'https://en.wikipedia.org/wiki/{title.replace(" ", "_")}'}}}],
+        })
+    return {'events': events}
+
+class FeedStub:
+    def __init__(self, latency=0.0, failure_rate=0.0, events_per_day=40, port=0):
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock: stub.requests += 1
+                time.sleep(latency)
+                try:
+                    month, day = (int(part) for part in self.path.rstrip('/').split('/')[-2:])
+                except ValueError:
+                    return self.send_error(404)
+                if random.random() < failure_rate:
+                    return self.send_error(503)
+                body = json.dumps(make_payload(month, day, events_per_day)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    with FeedStub(args.latency, args.failure_rate, port=args.port) as stub:
+        print(f'Serving on {stub.url}')
+        threading.Event().wait()
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,53 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///app.db').replace("postgres://", "postgresql://")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JSONIFY_PRETTYPRINT_REGULAR = False
+    # Optional read replica: GET requests read from it (app/engines.py).
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL'].replace("postgres://", "postgresql://")} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    # After a write, that client's reads stay on the primary this long so replica lag can't hide it.
+    REPLICA_PIN_SECONDS = float(os.environ.get('REPLICA_PIN_SECONDS', 5))
+    SQLITE_PRAGMAS = {}
+
+    # --- Password hashing: bcrypt cost and the per-worker pool it runs on ---
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = 10.0
+
+    # --- Request/SQL metrics at /api/metrics; METRICS_DIR aggregates gunicorn workers ---
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_QUERY_THRESHOLD = int(os.environ.get('METRICS_QUERY_THRESHOLD', 20))
+    METRICS_FLUSH_INTERVAL = 1.0
+
+    # --- Pagination ---
+    EVENTS_PAGE_SIZE = int(os.environ.get('EVENTS_PAGE_SIZE', 200))
+    EVENTS_MAX_PAGE_SIZE = int(os.environ.get('EVENTS_MAX_PAGE_SIZE', 1000))
+    EVENTS_STREAM_CHUNK_SIZE = 500
+    SEARCH_PAGE_SIZE = 20
+    # Answer event list filters from a per-worker NumPy snapshot (app/columnar.py).
+    EVENTS_COLUMNAR_INDEX = os.environ.get('EVENTS_COLUMNAR_INDEX') == '1'
+
+    # --- Trivia: questions per /api/trivia?n= batch, seconds before the shared deck picks up new rows ---
+    TRIVIA_MAX_BATCH = 50
+    TRIVIA_DECK_TTL = int(os.environ.get('TRIVIA_DECK_TTL', 600))
+
+    # --- POST /api/events/bulk: rows per transaction, longest accepted row ---
+    BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
+    BULK_MAX_ROW_CHARS = 64 * 1024
+
+    # --- Response cache: 'memory' (per worker), 'redis' (shared) or 'none' ---
+    # The memory backend's invalidations go through CACHE_TAG_FILE, which every
+    # worker on the host maps (defaults to <instance>/cache_tags); use redis
+    # when workers run on more than one host.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_TAG_FILE = os.environ.get('CACHE_TAG_FILE')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+    CACHE_MAX_ENTRIES = 2048
+
+    # --- Wikipedia "on this day" importer ---
+    ONTHISDAY_API_URL = os.environ.get('ONTHISDAY_API_URL', 'https://en.wikipedia.org/api/rest_v1/feed/onthisday/events')
+    FEED_CACHE_DIR = os.environ.get('FEED_CACHE_DIR')  # defaults to <instance>/feed_cache
 
     # --- PRODUCTION COOKIE CONFIGURATION ---
     # These settings are essential for session cookies to work across domains on Render.
@@ -13,4 +60,39 @@ class Config:
     if os.environ.get("FLASK_DEBUG") != '1':
         SESSION_COOKIE_SECURE = True
         SESSION_COOKIE_HTTPONLY = True
-        SESSION_COOKIE_SAMESITE = 'None'
\ No newline at end of file
+        SESSION_COOKIE_SAMESITE = 'None'
+
+# --- Database profiles: engine tuning per backend, chosen by DB_PROFILE or the URI scheme ---
+class SQLiteConfig(Config):
+    # WAL lets readers run alongside the single writer; NORMAL is durable in
+    # WAL mode except for the last transactions on power loss.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'foreign_keys': 'ON',
+        'cache_size': -32000,  # KiB
+        'temp_store': 'MEMORY',
+    }
+
+class PostgresConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        # Sized for gunicorn's threads per worker (gunicorn.conf.py).
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 8)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 4)),
+        'pool_timeout': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+        'connect_args': {'connect_timeout': 5},
+    }
+    # Per transaction inside web requests only (app/engines.py): migrations,
+    # snapshot imports and rebuilds from the CLI run as long as they need.
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    SQLALCHEMY_BINDS = {'replica': {'url': Config.SQLALCHEMY_BINDS['replica'], **SQLALCHEMY_ENGINE_OPTIONS}} if Config.SQLALCHEMY_BINDS else {}
+
+PROFILES = {'default': Config, 'sqlite': SQLiteConfig, 'postgres': PostgresConfig}
+
+def get_config(name=None, uri=None):
+    name = name or os.environ.get('DB_PROFILE')
+    if not name: name = 'postgres' if (uri or Config.SQLALCHEMY_DATABASE_URI).startswith('postgresql') else 'sqlite'
+    return PROFILES[name]
@@ -0,0 +1,14 @@
+import os
+
+# Threaded workers: a login waiting on the bcrypt pool (app/passwords.py)
+# holds one thread, not the whole worker, so cheap reads keep flowing.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+def on_starting(server):
+    # Per-worker metric dumps from a previous run would be summed into this one.
+    directory = os.environ.get('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'): os.remove(os.path.join(directory, name))
@@ -0,0 +1,55 @@
+"""Add indexes for the event date/category filter paths
+
+Revision ID: 7c2d9e41a3b5
+Revises: 0e301fb810fa
+Create Date: 2026-10-18 11:20:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d9e41a3b5'
+down_revision = '0e301fb810fa'
+branch_labels = None
+depends_on = None
+
+DUPLICATES = sa.text(
+    "SELECT ec.id, ec.event_id, ec.category_id, ec.relationship_description FROM event_categories ec JOIN "
+    "(SELECT event_id, category_id FROM event_categories GROUP BY event_id, category_id HAVING COUNT(*) > 1) d "
+    "ON ec.event_id = d.event_id AND ec.category_id = d.category_id "
+    "ORDER BY ec.event_id, ec.category_id, ec.id"
+)
+LISTED = 100
+
+
+def upgrade():
+    # Duplicate links would block the unique constraint, and each copy can carry
+    # its own relationship_description, so stop and list them instead of choosing.
+    rows = op.get_bind().execute(DUPLICATES).fetchall()
+    if rows:
+        listing = '\n'.join(f'  id={r.id} event_id={r.event_id} category_id={r.category_id} {r.relationship_description!r}' for r in rows[:LISTED])
+        if len(rows) > LISTED: listing += f'\n  ... and {len(rows) - LISTED} more'
+        raise RuntimeError(
+            f'{len(rows)} event_categories rows link an event to a category it is already linked to. '
+            f'Merge their descriptions and delete the extra rows, then rerun the upgrade:\n{listing}')
+    op.create_index('ix_events_year_month_day_id', 'events', ['year', 'month', 'day', 'id'], unique=False)
+    op.create_index('ix_events_month_day_year', 'events', ['month', 'day', 'year'], unique=False)
+    op.create_index('ix_events_created_at_id', 'events', ['created_at', 'id'], unique=False)
+    op.create_index('ix_events_year_month_day_title', 'events', ['year', 'month', 'day', 'title'], unique=False)
+
+    with op.batch_alter_table('event_categories', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_event_categories_event_id_category_id', ['event_id', 'category_id'])
+    op.create_index('ix_event_categories_category_id_event_id', 'event_categories', ['category_id', 'event_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_event_categories_category_id_event_id', table_name='event_categories')
+    with op.batch_alter_table('event_categories', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_event_categories_event_id_category_id', type_='unique')
+
+    op.drop_index('ix_events_year_month_day_title', table_name='events')
+    op.drop_index('ix_events_created_at_id', table_name='events')
+    op.drop_index('ix_events_month_day_year', table_name='events')
+    op.drop_index('ix_events_year_month_day_id', table_name='events')
@@ -0,0 +1,31 @@
+"""Cascade event/category deletes to event_categories in the database
+
+Revision ID: a4c6e2d8f1b9
+Revises: f2b7d4c9a8e1
+Create Date: 2026-10-18 16:05:12.447120
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c6e2d8f1b9'
+down_revision = 'f2b7d4c9a8e1'
+branch_labels = None
+depends_on = None
+
+
+def _recreate_foreign_keys(**options):
+    with op.batch_alter_table('event_categories', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_event_categories_category_id_categories', type_='foreignkey')
+        batch_op.drop_constraint('fk_event_categories_event_id_events', type_='foreignkey')
+        batch_op.create_foreign_key(batch_op.f('fk_event_categories_category_id_categories'), 'categories', ['category_id'], ['id'], **options)
+        batch_op.create_foreign_key(batch_op.f('fk_event_categories_event_id_events'), 'events', ['event_id'], ['id'], **options)
+
+
+def upgrade():
+    _recreate_foreign_keys(ondelete='CASCADE')
+
+
+def downgrade():
+    _recreate_foreign_keys()
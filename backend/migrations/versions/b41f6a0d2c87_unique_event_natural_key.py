@@ -0,0 +1,44 @@
+"""Make (year, month, day, title) a unique natural key for events
+
+Revision ID: b41f6a0d2c87
+Revises: 7c2d9e41a3b5
+Create Date: 2026-10-18 12:02:13.904127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f6a0d2c87'
+down_revision = '7c2d9e41a3b5'
+branch_labels = None
+depends_on = None
+
+DUPLICATES = sa.text(
+    "SELECT e.id, e.user_id, e.year, e.month, e.day, e.title FROM events e JOIN "
+    "(SELECT year, month, day, title FROM events GROUP BY year, month, day, title HAVING COUNT(*) > 1) d "
+    "ON e.year = d.year AND e.month = d.month AND e.day = d.day AND e.title = d.title "
+    "ORDER BY e.year, e.month, e.day, e.title, e.id"
+)
+LISTED = 100
+
+
+def upgrade():
+    # The importer's per-row check kept these unique already; only hand-submitted
+    # duplicates can exist, and which copy to keep is for their owners to decide,
+    # so stop and list them instead of dropping any.
+    rows = op.get_bind().execute(DUPLICATES).fetchall()
+    if rows:
+        listing = '\n'.join(f'  id={r.id} user_id={r.user_id} {r.year}-{r.month:02d}-{r.day:02d} {r.title!r}' for r in rows[:LISTED])
+        if len(rows) > LISTED: listing += f'\n  ... and {len(rows) - LISTED} more'
+        raise RuntimeError(
+            f'{len(rows)} events share a year, month, day and title with another event. '
+            f'Rename or delete the extra copies, then rerun the upgrade:\n{listing}')
+    op.drop_index('ix_events_year_month_day_title', table_name='events')
+    op.create_index('uq_events_year_month_day_title', 'events', ['year', 'month', 'day', 'title'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_events_year_month_day_title', table_name='events')
+    op.create_index('ix_events_year_month_day_title', 'events', ['year', 'month', 'day', 'title'], unique=False)
@@ -0,0 +1,33 @@
+"""Add backfill_days checkpoint table
+
+Revision ID: d93e5b7f1a24
+Revises: b41f6a0d2c87
+Create Date: 2026-10-18 12:41:05.227930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93e5b7f1a24'
+down_revision = 'b41f6a0d2c87'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('backfill_days',
+    sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('month', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('day', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('year', 'month', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('backfill_days')
@@ -0,0 +1,80 @@
+"""Add full-text search index over event titles and descriptions
+
+Revision ID: e5a1c8f3b6d0
+Revises: d93e5b7f1a24
+Create Date: 2026-10-18 13:22:47.611092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c8f3b6d0'
+down_revision = 'd93e5b7f1a24'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE events_fts USING fts5("
+    "title, description, content='events', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER events_fts_ai AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER events_fts_ad AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER events_fts_au AFTER UPDATE OF title, description ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+SQLITE_BACKFILL = (
+    "INSERT INTO events_fts(rowid, title, description) "
+    "SELECT id, title, description FROM events WHERE id > :low AND id <= :high"
+)
+
+POSTGRES_UPGRADE = (
+    "ALTER TABLE events ADD COLUMN search_vector tsvector",
+    "CREATE OR REPLACE FUNCTION events_search_vector_update() RETURNS trigger AS $$ BEGIN "
+    "NEW.search_vector := setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B'); RETURN NEW; END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER events_search_vector_trg BEFORE INSERT OR UPDATE OF title, description ON events "
+    "FOR EACH ROW EXECUTE FUNCTION events_search_vector_update()",
+)
+POSTGRES_BACKFILL = (
+    "UPDATE events SET search_vector = "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') "
+    "WHERE id > :low AND id <= :high"
+)
+
+
+def _backfill(bind, statement):
+    # Walk the id range in fixed slices so no single statement touches the whole table.
+    low, high = bind.execute(sa.text("SELECT COALESCE(MIN(id), 1) - 1, COALESCE(MAX(id), 0) FROM events")).one()
+    while low < high:
+        bind.execute(sa.text(statement), {'low': low, 'high': low + BATCH_SIZE})
+        low += BATCH_SIZE
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for statement in SQLITE_UPGRADE: op.execute(statement)
+        _backfill(bind, SQLITE_BACKFILL)
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_UPGRADE: op.execute(statement)
+        _backfill(bind, POSTGRES_BACKFILL)
+        op.execute("CREATE INDEX ix_events_search_vector ON events USING GIN (search_vector)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('events_fts_au', 'events_fts_ad', 'events_fts_ai'): op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE events_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX ix_events_search_vector")
+        op.execute("DROP TRIGGER events_search_vector_trg ON events")
+        op.execute("DROP FUNCTION events_search_vector_update()")
+        op.execute("ALTER TABLE events DROP COLUMN search_vector")
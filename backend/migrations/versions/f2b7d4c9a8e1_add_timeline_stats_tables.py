@@ -0,0 +1,49 @@
+"""Add timeline aggregate tables
+
+Revision ID: f2b7d4c9a8e1
+Revises: e5a1c8f3b6d0
+Create Date: 2026-10-18 13:52:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d4c9a8e1'
+down_revision = 'e5a1c8f3b6d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stats_day_counts',
+    sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('month', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('day', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('year', 'month', 'day')
+    )
+    with op.batch_alter_table('stats_day_counts', schema=None) as batch_op:
+        batch_op.create_index('ix_stats_day_counts_month_day', ['month', 'day'], unique=False)
+
+    op.create_table('stats_category_counts',
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('category_id', 'year')
+    )
+
+    op.execute("INSERT INTO stats_day_counts (year, month, day, count) "
+               "SELECT year, month, day, count(*) FROM events GROUP BY year, month, day")
+    op.execute("INSERT INTO stats_category_counts (category_id, year, count) "
+               "SELECT ec.category_id, e.year, count(*) FROM event_categories ec "
+               "JOIN events e ON e.id = ec.event_id GROUP BY ec.category_id, e.year")
+
+
+def downgrade():
+    op.drop_table('stats_category_counts')
+    with op.batch_alter_table('stats_day_counts', schema=None) as batch_op:
+        batch_op.drop_index('ix_stats_day_counts_month_day')
+
+    op.drop_table('stats_day_counts')
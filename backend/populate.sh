@@ -1,11 +1,8 @@
-echo "Starting massive data population from 2000 to 2024..."
-echo "This will take a long time. Please be patient."
+echo "Starting data population from 2000 to 2024..."
+echo "Each month/day feed is fetched once and shared by every year in the range."
+echo "If this stops partway, run it again: finished days are skipped."
 
-for year in $(seq 2000 2024); do
-  echo "----------------------------------------------------"
-  echo "FETCHING DATA FOR YEAR: $year"
-  echo "----------------------------------------------------"
-  flask populate_db_year "$year" --fast
-done
+flask backfill run 2000 2024 --fast
+flask backfill status
 
-echo "All full years have been populated!"
\ No newline at end of file
+echo "All full years have been populated!"
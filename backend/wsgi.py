@@ -1,38 +1,38 @@
+import calendar
+import os
 import time
 import click
-import requests # type: ignore
-from datetime import datetime, date, timedelta
-from app import create_app, db
-from app.models import User, Event, Category, EventCategory
+from datetime import date
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app import create_app, db, response_cache
+from app.ingest import FeedCache, FeedFetcher, ingest_units, units_in_years, units_until
+from app.models import User, Event, Category, EventCategory, BackfillDay, DayCount
+from app.snapshot import SnapshotError, export_snapshot, import_snapshot
+from app.stats import rebuild_stats
+from app.synthetic import SYNTHETIC_PASSWORD, generate
 
 app = create_app()
 
-def _fetch_and_save_day(month, day, archivist, keywords):
-    """Helper function to fetch and save events for a single day."""
+def _feed_cache():
+    return FeedCache(app.config['FEED_CACHE_DIR'] or os.path.join(app.instance_path, 'feed_cache'))
+
+def _populate(units, fast=False, rate=None, workers=8, batch_size=1000, offline=False, resume=True):
+    archivist = User.query.filter_by(username='Archivist').first()
+    if not archivist: return print("Archivist user not found. Run 'flask seed_db' first.")
+    if fast: print("--- RUNNING IN FAST MODE ---")
+    fetcher = FeedFetcher(app.config['ONTHISDAY_API_URL'], rate=rate or (10.0 if fast else 1.0), workers=workers, cache=_feed_cache(), offline=offline)
     try:
-        print(f"Fetching events for {month}/{day}...")
-        API_ENDPOINT = f"https://en.wikipedia.org/api/rest_v1/feed/onthisday/events/{month}/{day}"
-        headers = {'User-Agent': 'TechTimeCapsule/1.0 (dev project; contact@example.com)'}
-        response = requests.get(API_ENDPOINT, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        for event_data in data.get('events', []):
-            text = event_data['text'].lower()
-            if any(keyword in text for keyword in keywords):
-                title = event_data['pages'][0]['title']
-                event_year = event_data['year']
-                existing_event = Event.query.filter_by(year=event_year, month=month, day=day, title=title).first()
-                if not existing_event:
-                    new_event = Event(title=title, description=event_data['text'],year=event_year, month=month, day=day,source_link=event_data['pages'][0]['content_urls']['desktop']['page'],user_id=archivist.id)
-                    db.session.add(new_event)
-        db.session.commit()
-    except Exception as e:
-        print(f"An error occurred for {month}/{day}: {e}")
-        db.session.rollback()
+        failed = ingest_units(fetcher, units, archivist, batch_size=batch_size, resume=resume)
+    finally:
+        fetcher.close()
+    if failed: print(f"{len(failed)} feed(s) failed: " + ', '.join(f"{m}/{d}" for m, d in sorted(failed)) + ". Run 'flask backfill status' for details.")
+    return failed
 
 @app.cli.command("seed_db")
 def seed_db():
     print("Deleting all records...")
+    BackfillDay.query.delete()
     EventCategory.query.delete()
     Event.query.delete()
     Category.query.delete()
@@ -48,7 +48,9 @@ def seed_db():
     cat_os = Category(name="Operating Systems", description="Software that manages computer hardware and software resources.", user_id=archivist.id)
     cat_web = Category(name="World Wide Web", description="Events related to the development of the internet and web technologies.", user_id=archivist.id)
     cat_company = Category(name="Company Milestones", description="Significant moments for major tech companies.", user_id=archivist.id)
-    db.session.add_all([cat_pl, cat_os, cat_web, cat_company])
+    cat_hardware = Category(name="Computing Hardware", description="Computers, chips, robots and the machines behind them.", user_id=archivist.id)
+    cat_space = Category(name="Space Exploration", description="Spaceflight and the technology that made it possible.", user_id=archivist.id)
+    db.session.add_all([cat_pl, cat_os, cat_web, cat_company, cat_hardware, cat_space])
     db.session.commit()
 
     event1 = Event(title="First iPhone Announced", description="Steve Jobs unveiled the first iPhone, a device that combined a widescreen iPod with touch controls, a mobile phone, and an internet communicator.", year=2007, month=1, day=9, user_id=archivist.id, image_url="https://images.unsplash.com/photo-1510557880182-3d4d3cba35a5?q=80&w=2070&auto=format&fit=crop", source_link="https://en.wikipedia.org/wiki/IPhone_(1st_generation)")
@@ -65,46 +67,118 @@ def seed_db():
     assoc4 = EventCategory(event_id=event4.id, category_id=cat_company.id, relationship_description="Became the dominant force in web search")
     db.session.add_all([assoc1, assoc2, assoc3, assoc4])
     db.session.commit()
+    rebuild_stats()
+    db.session.commit()
+    response_cache.clear()
     print("Database seeded with high-quality sample data!")
 
+@app.cli.command("rebuild_stats")
+def rebuild_stats_command():
+    """Recompute the timeline aggregates from scratch."""
+    rebuild_stats()
+    db.session.commit()
+    response_cache.invalidate('stats')
+    days, total = db.session.query(func.count(), func.coalesce(func.sum(DayCount.count), 0)).one()
+    print(f"Rebuilt timeline stats: {total} events over {days} distinct days.")
+
+@app.cli.command("seed_synthetic")
+@click.option("--users", type=click.IntRange(min=1), default=10, show_default=True)
+@click.option("--categories", type=click.IntRange(min=1), default=20, show_default=True)
+@click.option("--events", type=click.IntRange(min=0), default=10000, show_default=True)
+@click.option("--links-per-event", type=click.IntRange(min=0), default=1, show_default=True, help="Category links per event.")
+@click.option("--seed", type=int, default=0, show_default=True, help="Same seed, same rows (on an empty database).")
+@click.option("--batch-size", type=int, default=10000, show_default=True, help="Rows per INSERT/commit.")
+def seed_synthetic(users, categories, events, links_per_event, seed, batch_size):
+    """Bulk-load a reproducible synthetic dataset without touching the network."""
+    print(f"Generating {events} synthetic events...")
+    counts = generate(users, categories, events, links_per_event, seed, batch_size)
+    response_cache.clear()
+    print("Inserted " + ", ".join(f"{n} {table}" for table, n in counts.items()) + f". Every synthetic user's password is '{SYNTHETIC_PASSWORD}'.")
+
+@app.cli.command("export_snapshot")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--chunk-size", type=click.IntRange(min=1), default=50000, show_default=True, help="Rows per chunk line.")
+def export_snapshot_command(path, chunk_size):
+    """Write users, categories, events and their links to a gzipped snapshot file."""
+    start = time.perf_counter()
+    counts = export_snapshot(path, chunk_size)
+    print("Exported " + ", ".join(f"{n} {table}" for table, n in counts.items()) + f" to {path} in {time.perf_counter() - start:.1f}s.")
+
+@app.cli.command("import_snapshot")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--replace", is_flag=True, help="Delete the current users, categories, events and links first.")
+@click.option("--if-empty", is_flag=True, help="Do nothing (successfully) when the database already has data.")
+def import_snapshot_command(path, replace, if_empty):
+    """Bulk-load a snapshot written by export_snapshot; no network needed."""
+    if if_empty and (db.session.query(User.id).first() or db.session.query(Event.id).first()):
+        return print("The database already has data; skipping the snapshot import.")
+    start = time.perf_counter()
+    try:
+        counts = import_snapshot(path, replace=replace)
+    except SnapshotError as e:
+        raise click.ClickException(str(e))
+    response_cache.clear()
+    print("Imported " + ", ".join(f"{n} {table}" for table, n in counts.items()) + f" in {time.perf_counter() - start:.1f}s.")
+
+fetch_options = [
+    click.option("--fast", is_flag=True, help="Allow 10 requests per second instead of 1."),
+    click.option("--rate", type=float, help="Requests per second across all workers (overrides --fast)."),
+    click.option("--workers", type=int, default=8, show_default=True, help="Concurrent HTTP connections."),
+    click.option("--batch-size", type=int, default=1000, show_default=True, help="Events per INSERT/commit."),
+]
+
+def with_fetch_options(command):
+    for option in reversed(fetch_options): command = option(command)
+    return command
+
 @app.cli.command("populate_db_year")
 @click.argument("year", type=int)
-@click.option("--fast", is_flag=True, help="Run without the 1-second delay between requests.")
-def populate_db_year(year, fast):
-    delay = 0.1 if fast else 1.0
-    if fast: print("--- RUNNING IN FAST MODE ---")
+@with_fetch_options
+def populate_db_year(year, **options):
     print(f"Starting to populate database for the year {year}...")
-    archivist = User.query.filter_by(username='Archivist').first()
-    if not archivist: return print("Archivist user not found. Run 'flask seed_db' first.")
-    tech_keywords = ['computer', 'internet', 'software', 'apple', 'microsoft', 'google', 'nasa', 'space', 'robot', 'web', 'semiconductor', 'chip']
-    for month in range(1, 13):
-        for day in range(1, 32):
-            try:
-                datetime(year=year, month=month, day=day)
-                _fetch_and_save_day(month, day, archivist, tech_keywords)
-                time.sleep(delay)
-            except ValueError:
-                continue
+    _populate(units_in_years(year, year), **options)
     print(f"Finished populating database for the year {year}!")
 
 @app.cli.command("populate_db_to_today")
-@click.option("--fast", is_flag=True, help="Run without the 1-second delay.")
-def populate_db_to_today(fast):
-    delay = 0.1 if fast else 1.0
-    if fast: print("--- RUNNING IN FAST MODE ---")
+@with_fetch_options
+def populate_db_to_today(**options):
     today = date.today()
-    current_year = today.year
-    print(f"Starting to populate database from Jan 1, {current_year} to {today}...")
-    archivist = User.query.filter_by(username='Archivist').first()
-    if not archivist: return print("Archivist user not found. Run 'flask seed_db' first.")
-    tech_keywords = ['computer', 'internet', 'software', 'apple', 'microsoft', 'google', 'nasa', 'space', 'robot', 'web', 'semiconductor', 'chip']
-    start_date = date(current_year, 1, 1)
-    delta = today - start_date
-    for i in range(delta.days + 1):
-        current_day = start_date + timedelta(days=i)
-        _fetch_and_save_day(current_day.month, current_day.day, archivist, tech_keywords)
-        time.sleep(delay)
-    print(f"Finished populating database for {current_year}!")
+    print(f"Starting to populate database from Jan 1, {today.year} to {today}...")
+    _populate(units_until(today), **options)
+    print(f"Finished populating database for {today.year}!")
+
+backfill_cli = AppGroup("backfill", help="Resumable backfill from the on-this-day feed.")
+
+@backfill_cli.command("run")
+@click.argument("first_year", type=int)
+@click.argument("last_year", type=int)
+@with_fetch_options
+@click.option("--offline", is_flag=True, help="Read feeds only from the local cache.")
+@click.option("--redo", is_flag=True, help="Ignore checkpoints and reprocess finished days.")
+def backfill_run(first_year, last_year, offline, redo, **options):
+    print(f"Backfilling {first_year}-{last_year}...")
+    _populate(units_in_years(first_year, last_year), offline=offline, resume=not redo, **options)
+    print(f"Finished backfilling {first_year}-{last_year}!")
+
+@backfill_cli.command("status")
+@click.option("--errors", type=int, default=20, show_default=True, help="How many failed days to list.")
+def backfill_status(errors):
+    rows = db.session.query(BackfillDay.year, BackfillDay.status, func.count()).group_by(BackfillDay.year, BackfillDay.status).all()
+    if not rows: print("No backfill has been recorded yet.")
+    by_year = {}
+    for year, status, count in rows: by_year.setdefault(year, {})[status] = count
+    for year in sorted(by_year):
+        total = 366 if calendar.isleap(year) else 365
+        done, failed = by_year[year].get('done', 0), by_year[year].get('failed', 0)
+        print(f"{year}: {done}/{total} days done ({100 * done / total:.0f}%), {failed} failed")
+    failures = BackfillDay.query.filter_by(status='failed').order_by(BackfillDay.year, BackfillDay.month, BackfillDay.day).limit(errors).all()
+    if failures: print("Failed days:")
+    for f in failures: print(f"  {f.year}-{f.month:02d}-{f.day:02d}  attempts={f.attempts}  {f.error}")
+    cache = _feed_cache()
+    files, size = cache.stats()
+    print(f"Feed cache: {files} payload(s), {size / 1e6:.1f} MB in {cache.directory}")
+
+app.cli.add_command(backfill_cli)
 
 if __name__ == '__main__':
     app.run(port=5555, debug=True)
\ No newline at end of file
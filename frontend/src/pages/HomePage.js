@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import apiClient from '../api/axios';
 import EventCard from '../components/EventCard';
@@ -24,9 +24,19 @@ function HomePage() {
     });
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState('');
+    // GET /api/events returns one page at a time; the next page's cursor comes back in X-Next-Cursor.
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+    const latestRequest = useRef(0);
 
-    const fetchEvents = useCallback(async () => {
-        setIsLoading(true);
+    const fetchEvents = useCallback(async (cursor = null) => {
+        const requestId = cursor ? latestRequest.current : ++latestRequest.current;
+        if (cursor) {
+            setIsLoadingMore(true);
+        } else {
+            setIsLoading(true);
+            setNextCursor(null);
+        }
         setError('');
         const params = new URLSearchParams();
         let url = '/api/events';
@@ -55,15 +65,21 @@ function HomePage() {
             if (filters.sort === 'newest') {
                 params.append('sort', 'newest');
             }
+            if (cursor) params.append('cursor', cursor);
         }
         try {
             const response = await apiClient.get(`${url}?${params.toString()}`);
-            setEvents(response.data);
-            if (response.data.length === 0) setError('No events found for this selection.');
+            if (requestId !== latestRequest.current) return; // the filters changed while this page loaded
+            setEvents(prevEvents => cursor ? [...prevEvents, ...response.data] : response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+            if (!cursor && response.data.length === 0) setError('No events found for this selection.');
         } catch (err) {
-            setError(err.response?.data?.error || 'An error occurred while fetching events.');
+            if (requestId === latestRequest.current) setError(err.response?.data?.error || 'An error occurred while fetching events.');
         } finally {
-            setIsLoading(false);
+            if (requestId === latestRequest.current) {
+                setIsLoading(false);
+                setIsLoadingMore(false);
+            }
         }
     }, [filters, isInitialLoad, viewMode]);
 
@@ -135,6 +151,11 @@ function HomePage() {
             {isLoading && <p>Loading events...</p>}
             {error && <p style={{color: 'orange'}}>{error}</p>}
             {!isLoading && events.map(event => <EventCard key={event.id} event={event} onDelete={handleEventDelete} />)}
+            {!isLoading && nextCursor && (
+                <button onClick={() => fetchEvents(nextCursor)} disabled={isLoadingMore}>
+                    {isLoadingMore ? 'Loading more events...' : 'Load more events'}
+                </button>
+            )}
         </div>
     );
 }
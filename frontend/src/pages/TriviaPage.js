@@ -1,6 +1,11 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import apiClient from '../api/axios';
 
+// Questions come in batches from the server, which deals each player a
+// non-repeating sequence; the next batch is fetched before the queue runs dry.
+const BATCH_SIZE = 10;
+const REFILL_BELOW = 3;
+
 function TriviaPage() {
     const initialScore = Number(localStorage.getItem('triviaScore')) || 0;
     const [score, setScore] = useState(initialScore);
@@ -14,16 +19,33 @@ function TriviaPage() {
         localStorage.setItem('triviaScore', score);
     }, [score]);
 
+    const queue = useRef([]);
+    const refilling = useRef(null);
+
+    const refill = useCallback(() => {
+        if (!refilling.current) {
+            refilling.current = apiClient.get('/api/trivia', { params: { n: BATCH_SIZE } })
+                .then(res => { queue.current.push(...res.data); })
+                .finally(() => { refilling.current = null; });
+        }
+        return refilling.current;
+    }, []);
+
     const fetchQuestion = useCallback(() => {
-        setLoading(true);
         setFeedback('');
         setGuess('');
         setAnswered(false);
-        apiClient.get('/api/trivia')
-            .then(res => setQuestion(res.data))
+        if (queue.current.length) {
+            setQuestion(queue.current.shift());
+            if (queue.current.length < REFILL_BELOW) refill().catch(() => {});
+            return;
+        }
+        setLoading(true);
+        refill()
+            .then(() => setQuestion(queue.current.shift() || null))
             .catch(err => setFeedback('Could not load a question. Please try again.'))
             .finally(() => setLoading(false));
-    }, []);
+    }, [refill]);
 
     useEffect(() => {
         fetchQuestion();